@@ -73,6 +73,51 @@ enum heif_channel
 // Version string of linked libheif library.
 const char* heif_get_version(void);
 
+// ========================= library initialization =========================
+
+struct heif_init_params
+{
+  int version;
+};
+
+// Initialise library. Loads the plugins from the default plugin directory.
+// You should call heif_init() when you start using libheif and heif_deinit() when you are finished.
+// These calls are reference counted. Each call to heif_init() should be matched by one call to heif_deinit().
+// 'params' can be NULL.
+struct heif_error heif_init(struct heif_init_params*);
+
+// Deinitialise and clean up library.
+// Note: heif_deinit() must not be called while still using libheif objects.
+void heif_deinit(void);
+
+struct heif_plugin_info;
+
+// Load all plugins from the given directory. Plugins which are already loaded are skipped.
+// 'out_plugins' and 'out_nPluginsLoaded' can be NULL.
+struct heif_error heif_load_plugins(const char* directory,
+                                    const struct heif_plugin_info** out_plugins,
+                                    int* out_nPluginsLoaded,
+                                    int output_array_size);
+
+enum heif_compression_format
+{
+  heif_compression_undefined = 0,
+  heif_compression_HEVC = 1,
+  heif_compression_AVC = 2,
+  heif_compression_JPEG = 3,
+  heif_compression_AV1 = 4
+};
+
+struct heif_decoder_descriptor;
+
+// Get a list of available decoders. You can filter the encoders by compression format.
+// Use format_filter==heif_compression_undefined to get all available decoders.
+// The returned list of decoders is sorted by their priority (which is a plugin property).
+// If out_decoders==NULL, only the number of decoders is returned.
+int heif_get_decoder_descriptors(enum heif_compression_format format_filter,
+                                 const struct heif_decoder_descriptor** out_decoders,
+                                 int count);
+
 enum heif_filetype_result
 {
   heif_filetype_no,
@@ -110,6 +155,11 @@ int heif_context_get_list_of_top_level_image_IDs(struct heif_context* ctx,
 
 struct heif_error heif_context_get_primary_image_ID(struct heif_context* ctx, heif_item_id* id);
 
+// Get a handle to the primary image of the HEIF file.
+// This is the image that should be displayed primarily when there are several images in the file.
+struct heif_error heif_context_get_primary_image_handle(struct heif_context* ctx,
+                                                        struct heif_image_handle**);
+
 // Get the image handle for a known image ID.
 struct heif_error heif_context_get_image_handle(struct heif_context* ctx,
                                                 heif_item_id id,
@@ -195,6 +245,19 @@ void heif_item_get_property_transform_crop_borders(const struct heif_context* co
                                                    int image_width, int image_height,
                                                    int* left, int* top, int* right, int* bottom);
 
+// ------------------------- thumbnails -------------------------
+
+// List the number of thumbnails assigned to this image handle. Usually 0 or 1.
+int heif_image_handle_get_number_of_thumbnails(const struct heif_image_handle* handle);
+
+int heif_image_handle_get_list_of_thumbnail_IDs(const struct heif_image_handle* handle,
+                                                heif_item_id* ids, int count);
+
+// Get the image handle of a thumbnail image.
+struct heif_error heif_image_handle_get_thumbnail(const struct heif_image_handle* main_image_handle,
+                                                  heif_item_id thumbnail_id,
+                                                  struct heif_image_handle** out_thumbnail_handle);
+
 // ------------------------- depth images -------------------------
 
 int heif_image_handle_has_depth_image(const struct heif_image_handle*);
@@ -431,3 +494,6 @@ const uint8_t* heif_image_get_plane_readonly(const struct heif_image*,
 
 // Release heif_image.
 void heif_image_release(const struct heif_image*);
+
+// Returns whether the image has 'premultiplied alpha'.
+int heif_image_is_premultiplied_alpha(struct heif_image* image);
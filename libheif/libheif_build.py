@@ -7,6 +7,12 @@ ffibuilder = FFI()
 with open("libheif/libheif_api.h") as f:
     ffibuilder.cdef(f.read())
 
+with open("libheif/pyheif_api.h") as f:
+    ffibuilder.cdef(f.read())
+
+with open("libheif/pyheif_helpers.c") as f:
+    helpers_source = f.read()
+
 include_dirs = ["/usr/local/include", "/usr/include", "/opt/local/include"]
 library_dirs = ["/usr/local/lib", "/usr/lib", "/lib", "/opt/local/lib"]
 
@@ -23,7 +29,8 @@ ffibuilder.set_source(
     #if LIBHEIF_NUMERIC_VERSION >= 0x01110000
         #include <libheif/heif_properties.h>
     #endif
-    """,
+    """
+    + helpers_source,
     include_dirs=include_dirs,
     library_dirs=library_dirs,
     libraries=["heif"],
@@ -0,0 +1,24 @@
+// Helpers implemented in pyheif_helpers.c, compiled into the _libheif_cffi module.
+
+// Copy interleaved RGB(A) pixels from 'src' to 'dst' in a single pass,
+// optionally swapping the R and B channels and converting between straight and
+// premultiplied alpha: 'premultiply' > 0 multiplies colors by alpha, < 0 divides
+// premultiplied colors by alpha, 0 copies them as is.
+// 'bytes_per_channel' is 1 or 2. Two-byte samples are big endian if 'big_endian' is set,
+// little endian otherwise, in both 'src' and 'dst'.
+// 'max_value' is the maximum sample value, e.g. 1023 for 10-bit images.
+// 'src' and 'dst' may be the same buffer if the strides are equal.
+void pyheif_convert_interleaved(const uint8_t* src, int src_stride,
+                                uint8_t* dst, int dst_stride,
+                                int width, int height, int channels,
+                                int bytes_per_channel, int big_endian, int max_value,
+                                int swap_rb, int premultiply);
+
+// Downscale interleaved pixels from 'src' to 'dst' by averaging the box of
+// source pixels covered by each destination pixel.
+// 'dst_width' and 'dst_height' must not be larger than the source size.
+// Sample format parameters are the same as in pyheif_convert_interleaved().
+// Returns 0 on success, -1 if memory allocation failed.
+int pyheif_downscale_box(const uint8_t* src, int src_stride, int src_width, int src_height,
+                         uint8_t* dst, int dst_stride, int dst_width, int dst_height,
+                         int channels, int bytes_per_channel, int big_endian);
@@ -0,0 +1,173 @@
+#include <stdlib.h>
+
+static inline uint32_t pyheif_read_sample(const uint8_t* p, int bytes_per_channel, int big_endian)
+{
+  if (bytes_per_channel == 1) {
+    return p[0];
+  }
+  return big_endian ? ((uint32_t) p[0] << 8) | p[1] : ((uint32_t) p[1] << 8) | p[0];
+}
+
+static inline void pyheif_write_sample(uint8_t* p, uint32_t value, int bytes_per_channel, int big_endian)
+{
+  if (bytes_per_channel == 1) {
+    p[0] = (uint8_t) value;
+  }
+  else if (big_endian) {
+    p[0] = (uint8_t) (value >> 8);
+    p[1] = (uint8_t) value;
+  }
+  else {
+    p[0] = (uint8_t) value;
+    p[1] = (uint8_t) (value >> 8);
+  }
+}
+
+static inline uint32_t pyheif_unpremultiply(uint32_t c, uint32_t a, uint32_t max_value)
+{
+  if (a == 0) {
+    return 0;
+  }
+  c = (c * max_value + a / 2) / a;
+  return c > max_value ? max_value : c;
+}
+
+static void pyheif_convert_interleaved_8bit(const uint8_t* src, int src_stride,
+                                            uint8_t* dst, int dst_stride,
+                                            int width, int height, int channels,
+                                            int swap_rb, int premultiply)
+{
+  int r = swap_rb ? 2 : 0;
+  int b = swap_rb ? 0 : 2;
+
+  for (int y = 0; y < height; y++) {
+    const uint8_t* in = src + (size_t) y * src_stride;
+    uint8_t* out = dst + (size_t) y * dst_stride;
+
+    for (int x = 0; x < width; x++, in += channels, out += channels) {
+      uint8_t c0 = in[r], c1 = in[1], c2 = in[b];
+      if (channels == 4) {
+        uint8_t a = in[3];
+        if (premultiply > 0 && a != 255) {
+          // Exact rounding of c * a / 255
+          uint32_t t;
+          t = c0 * a + 128; c0 = (uint8_t) ((t + (t >> 8)) >> 8);
+          t = c1 * a + 128; c1 = (uint8_t) ((t + (t >> 8)) >> 8);
+          t = c2 * a + 128; c2 = (uint8_t) ((t + (t >> 8)) >> 8);
+        }
+        else if (premultiply < 0 && a != 255) {
+          c0 = (uint8_t) pyheif_unpremultiply(c0, a, 255);
+          c1 = (uint8_t) pyheif_unpremultiply(c1, a, 255);
+          c2 = (uint8_t) pyheif_unpremultiply(c2, a, 255);
+        }
+        out[3] = a;
+      }
+      out[0] = c0;
+      out[1] = c1;
+      out[2] = c2;
+    }
+  }
+}
+
+void pyheif_convert_interleaved(const uint8_t* src, int src_stride,
+                                uint8_t* dst, int dst_stride,
+                                int width, int height, int channels,
+                                int bytes_per_channel, int big_endian, int max_value,
+                                int swap_rb, int premultiply)
+{
+  if (channels != 4) {
+    premultiply = 0;
+  }
+
+  if (bytes_per_channel == 1) {
+    pyheif_convert_interleaved_8bit(src, src_stride, dst, dst_stride,
+                                    width, height, channels, swap_rb, premultiply);
+    return;
+  }
+
+  int bpc = bytes_per_channel;
+  int pixel_size = channels * bpc;
+  int r = (swap_rb ? 2 : 0) * bpc;
+  int b = (swap_rb ? 0 : 2) * bpc;
+
+  for (int y = 0; y < height; y++) {
+    const uint8_t* in = src + (size_t) y * src_stride;
+    uint8_t* out = dst + (size_t) y * dst_stride;
+
+    for (int x = 0; x < width; x++, in += pixel_size, out += pixel_size) {
+      uint32_t c0 = pyheif_read_sample(in + r, bpc, big_endian);
+      uint32_t c1 = pyheif_read_sample(in + bpc, bpc, big_endian);
+      uint32_t c2 = pyheif_read_sample(in + b, bpc, big_endian);
+      if (channels == 4) {
+        uint32_t a = pyheif_read_sample(in + 3 * bpc, bpc, big_endian);
+        if (premultiply > 0 && a != (uint32_t) max_value) {
+          uint32_t half = (uint32_t) max_value / 2;
+          c0 = (c0 * a + half) / max_value;
+          c1 = (c1 * a + half) / max_value;
+          c2 = (c2 * a + half) / max_value;
+        }
+        else if (premultiply < 0 && a != (uint32_t) max_value) {
+          c0 = pyheif_unpremultiply(c0, a, max_value);
+          c1 = pyheif_unpremultiply(c1, a, max_value);
+          c2 = pyheif_unpremultiply(c2, a, max_value);
+        }
+        pyheif_write_sample(out + 3 * bpc, a, bpc, big_endian);
+      }
+      pyheif_write_sample(out, c0, bpc, big_endian);
+      pyheif_write_sample(out + bpc, c1, bpc, big_endian);
+      pyheif_write_sample(out + 2 * bpc, c2, bpc, big_endian);
+    }
+  }
+}
+
+int pyheif_downscale_box(const uint8_t* src, int src_stride, int src_width, int src_height,
+                         uint8_t* dst, int dst_stride, int dst_width, int dst_height,
+                         int channels, int bytes_per_channel, int big_endian)
+{
+  int bpc = bytes_per_channel;
+  int pixel_size = channels * bpc;
+
+  // Column ranges of the source box for every destination column
+  int* x_bounds = (int*) malloc(sizeof(int) * (dst_width + 1));
+  if (x_bounds == NULL) {
+    return -1;
+  }
+  for (int x = 0; x <= dst_width; x++) {
+    x_bounds[x] = (int) ((int64_t) x * src_width / dst_width);
+  }
+
+  for (int y = 0; y < dst_height; y++) {
+    int y0 = (int) ((int64_t) y * src_height / dst_height);
+    int y1 = (int) ((int64_t) (y + 1) * src_height / dst_height);
+    if (y1 <= y0) {
+      y1 = y0 + 1;
+    }
+    uint8_t* out = dst + (size_t) y * dst_stride;
+
+    for (int x = 0; x < dst_width; x++, out += pixel_size) {
+      int x0 = x_bounds[x];
+      int x1 = x_bounds[x + 1];
+      if (x1 <= x0) {
+        x1 = x0 + 1;
+      }
+
+      uint64_t sums[4] = {0, 0, 0, 0};
+      for (int sy = y0; sy < y1; sy++) {
+        const uint8_t* in = src + (size_t) sy * src_stride + (size_t) x0 * pixel_size;
+        for (int sx = x0; sx < x1; sx++, in += pixel_size) {
+          for (int c = 0; c < channels; c++) {
+            sums[c] += pyheif_read_sample(in + c * bpc, bpc, big_endian);
+          }
+        }
+      }
+
+      uint64_t count = (uint64_t) (x1 - x0) * (y1 - y0);
+      for (int c = 0; c < channels; c++) {
+        pyheif_write_sample(out + c * bpc, (uint32_t) ((sums[c] + count / 2) / count), bpc, big_endian);
+      }
+    }
+  }
+
+  free(x_bounds);
+  return 0;
+}
@@ -1,15 +1,34 @@
 import builtins
 import os
+import sys
 
 import _libheif_cffi
 
 from .constants import *
+from .exif import EXIF_TAGS
+from .library import *
+from .probe import *
 from .reader import *
 from .writer import *
 
-version_path = os.path.dirname(os.path.abspath(__file__)) + "/data/version.txt"
-with builtins.open(version_path) as f:
-    __version__ = f.read().strip()
+
+def _read_version():
+    version_path = os.path.dirname(os.path.abspath(__file__)) + "/data/version.txt"
+    with builtins.open(version_path) as f:
+        return f.read().strip()
+
+
+def __getattr__(name):
+    # __version__ is read from disk on first access only (PEP 562)
+    if name == "__version__":
+        global __version__
+        __version__ = _read_version()
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info < (3, 7):
+    __version__ = _read_version()
 
 
 def libheif_version():
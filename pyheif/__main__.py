@@ -0,0 +1,265 @@
+"""
+Command line interface:
+
+    python -m pyheif convert [options] INPUT...
+    python -m pyheif probe [options] INPUT...
+
+Run with --help for the list of options.
+"""
+import argparse
+import array
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pyheif
+from .probe import _probe_safe
+from .reader import _imap
+
+
+HEIF_SUFFIXES = {".heic", ".heif", ".hif", ".avif"}
+
+OUTPUT_SUFFIXES = {"jpeg": ".jpg", "png": ".png", "raw": ".raw"}
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    return args.command(args)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m pyheif")
+    subparsers = parser.add_subparsers(dest="command_name")
+    subparsers.required = True
+
+    def add_common_arguments(subparser):
+        subparser.add_argument("inputs", nargs="+", help="files or directories")
+        subparser.add_argument(
+            "-r", "--recursive", action="store_true",
+            help="look for HEIF files in subdirectories too",
+        )
+        subparser.add_argument(
+            "-j", "--workers", type=int, default=os.cpu_count() or 1,
+            help="number of parallel workers (default: number of CPUs)",
+        )
+        subparser.add_argument(
+            "-q", "--quiet", action="store_true",
+            help="don't print a line per file, only the summary",
+        )
+
+    convert = subparsers.add_parser("convert", help="convert HEIF files to JPEG, PNG or raw")
+    add_common_arguments(convert)
+    convert.add_argument(
+        "-f", "--format", choices=sorted(OUTPUT_SUFFIXES), default="jpeg",
+        help="output format (default: jpeg)",
+    )
+    convert.add_argument(
+        "-o", "--output-dir", type=pathlib.Path,
+        help="output directory (default: next to the input files)",
+    )
+    convert.add_argument(
+        "--processes", action="store_true",
+        help="use worker processes instead of threads",
+    )
+    convert.add_argument(
+        "--skip-existing", action="store_true",
+        help="skip files whose output is newer than the input",
+    )
+    size = convert.add_mutually_exclusive_group()
+    size.add_argument(
+        "--max-size", type=int,
+        help="downscale so the longer side is at most this many pixels",
+    )
+    size.add_argument(
+        "--thumbnail", action="store_true",
+        help="convert the embedded thumbnail if there is one",
+    )
+    convert.add_argument(
+        "--quality", type=int, default=90, help="JPEG quality (default: 90)"
+    )
+    convert.set_defaults(command=_convert)
+
+    probe = subparsers.add_parser("probe", help="print header information of HEIF files")
+    add_common_arguments(probe)
+    probe.set_defaults(command=_probe)
+
+    return parser.parse_args(argv)
+
+
+def _find_files(inputs, recursive):
+    """
+    Yields (path, base directory) for every HEIF file found in inputs.
+    Explicitly listed files are yielded regardless of their suffix.
+    """
+    for name in inputs:
+        path = pathlib.Path(name)
+        if not path.is_dir():
+            yield path, path.parent
+            continue
+        pattern = "**/*" if recursive else "*"
+        for child in sorted(path.glob(pattern)):
+            if child.suffix.lower() in HEIF_SUFFIXES and child.is_file():
+                yield child, path
+
+
+def _convert(args):
+    options = dict(
+        format=args.format,
+        quality=args.quality,
+        max_size=args.max_size,
+        thumbnail=args.thumbnail,
+        skip_existing=args.skip_existing,
+    )
+
+    def tasks():
+        for path, base in _find_files(args.inputs, args.recursive):
+            if args.output_dir is None:
+                output = path
+            else:
+                output = args.output_dir / path.relative_to(base)
+            output = output.with_suffix(OUTPUT_SUFFIXES[args.format])
+            yield path, output, options
+
+    executor_class = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+    results = _imap(_convert_file, tasks(), args.workers, executor_class)
+    return _report(results, args.quiet)
+
+
+def _convert_file(task):
+    path, output, options = task
+    start = time.perf_counter()
+    try:
+        size = path.stat().st_size
+        if options["skip_existing"] and _is_up_to_date(path, output):
+            return path, size, None, 0.0, None
+
+        output_format = "RGB" if options["format"] == "jpeg" else None
+        if options["max_size"]:
+            (heif_file,) = pyheif.read_pyramid(
+                path, [options["max_size"]], output_format=output_format
+            )
+        else:
+            heif_file = pyheif.open(path, output_format=output_format)
+            if options["thumbnail"]:
+                thumbnails = heif_file.thumbnails()
+                if thumbnails:
+                    heif_file = max(thumbnails, key=lambda t: max(t.size))
+            heif_file.load()
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        _write_image(heif_file, output, options)
+        return path, size, output, time.perf_counter() - start, None
+    except Exception as e:
+        return path, 0, None, time.perf_counter() - start, e
+
+
+def _is_up_to_date(path, output):
+    try:
+        return output.stat().st_mtime >= path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _write_image(heif_file, output, options):
+    if options["format"] == "raw":
+        # Tightly packed rows, without the padding libheif may add
+        width, height = heif_file.size
+        row_size = width * len(heif_file.mode) * int(heif_file.dtype[2:])
+        data = memoryview(heif_file.data)
+        with open(output, "wb") as f:
+            if heif_file.stride == row_size:
+                f.write(data[: row_size * height])
+            else:
+                for y in range(height):
+                    offset = y * heif_file.stride
+                    f.write(data[offset : offset + row_size])
+        return
+
+    from PIL import Image
+
+    image = Image.frombuffer(
+        heif_file.mode, heif_file.size, heif_file.data,
+        "raw", heif_file.mode, heif_file.stride, 1,
+    )
+    if options["format"] == "jpeg":
+        image.save(output, "JPEG", quality=options["quality"])
+    else:
+        image.save(output, "PNG")
+
+
+def _probe(args):
+    paths = (path for path, _ in _find_files(args.inputs, args.recursive))
+    start = time.perf_counter()
+
+    if not args.quiet:
+        print(
+            "path\twidth\theight\tbit_depth\thas_alpha\torientation"
+            "\timage_count\thas_depth\thas_auxiliary\thas_exif\terror"
+        )
+    count = errors = 0
+    for p in _imap(_probe_safe, paths, args.workers):
+        count += 1
+        errors += p.error is not None
+        if not args.quiet:
+            print(
+                f"{p.path}\t{p.width}\t{p.height}\t{p.bit_depth}\t{int(p.has_alpha)}"
+                f"\t{p.orientation}\t{p.image_count}\t{int(p.has_depth)}"
+                f"\t{int(p.has_auxiliary)}\t{int(p.has_exif)}\t{p.error or ''}"
+            )
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"probed {count} files, {errors} errors in {elapsed:.2f}s "
+        f"({count / elapsed if elapsed else 0:.1f} files/s)",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+def _report(results, quiet):
+    """
+    Prints a line per result as soon as it's available, then
+    a throughput summary. Returns the exit code.
+    """
+    start = time.perf_counter()
+    latencies = array.array("d")
+    converted = skipped = errors = total_bytes = 0
+
+    for path, size, output, elapsed, error in results:
+        if error is not None:
+            errors += 1
+            print(f"{path}: error: {error}", file=sys.stderr)
+            continue
+        if output is None:
+            skipped += 1
+            continue
+        converted += 1
+        total_bytes += size
+        latencies.append(elapsed)
+        if not quiet:
+            print(f"{path} -> {output} ({elapsed * 1000:.1f} ms)")
+
+    wall = time.perf_counter() - start
+    latencies = sorted(latencies)
+    print(
+        f"converted {converted} files, skipped {skipped}, {errors} errors "
+        f"in {wall:.2f}s: {converted / wall if wall else 0:.1f} files/s, "
+        f"{total_bytes / 1e6 / wall if wall else 0:.1f} MB/s, "
+        f"p50 {_percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p99 {_percentile(latencies, 99) * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = round(percent / 100 * (len(values) - 1))
+    return values[index]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,8 @@ heif_chroma_interleaved_RGB = 10
 heif_chroma_interleaved_RGBA = 11
 heif_chroma_interleaved_RRGGBB_BE = 12
 heif_chroma_interleaved_RRGGBBAA_BE = 13
+heif_chroma_interleaved_RRGGBB_LE = 14
+heif_chroma_interleaved_RRGGBBAA_LE = 15
 
 heif_colorspace_undefined = 99
 heif_colorspace_YCbCr = 0
@@ -22,6 +24,9 @@ heif_channel_B = 5
 heif_channel_Alpha = 6
 heif_channel_interleaved = 10
 
+heif_chroma_upsampling_nearest_neighbor = 1
+heif_chroma_upsampling_bilinear = 2
+
 
 def encode_fourcc(fourcc):
     encoded = (
@@ -54,3 +59,9 @@ heif_transform_mirror_direction_horizontal = 1
 
 LIBHEIF_AUX_IMAGE_FILTER_OMIT_ALPHA = 0x2
 LIBHEIF_AUX_IMAGE_FILTER_OMIT_DEPTH = 0x4
+
+heif_compression_undefined = 0
+heif_compression_HEVC = 1
+heif_compression_AVC = 2
+heif_compression_JPEG = 3
+heif_compression_AV1 = 4
@@ -0,0 +1,189 @@
+import struct
+
+
+# Commonly used tags by name, as (IFD, tag id). IFD names follow piexif.
+EXIF_TAGS = {
+    "Make": ("0th", 0x010F),
+    "Model": ("0th", 0x0110),
+    "Orientation": ("0th", 0x0112),
+    "Software": ("0th", 0x0131),
+    "DateTime": ("0th", 0x0132),
+    "ExposureTime": ("Exif", 0x829A),
+    "FNumber": ("Exif", 0x829D),
+    "ISOSpeedRatings": ("Exif", 0x8827),
+    "DateTimeOriginal": ("Exif", 0x9003),
+    "DateTimeDigitized": ("Exif", 0x9004),
+    "OffsetTimeOriginal": ("Exif", 0x9011),
+    "FocalLength": ("Exif", 0x920A),
+    "LensModel": ("Exif", 0xA434),
+    "GPSLatitudeRef": ("GPS", 0x0001),
+    "GPSLatitude": ("GPS", 0x0002),
+    "GPSLongitudeRef": ("GPS", 0x0003),
+    "GPSLongitude": ("GPS", 0x0004),
+    "GPSAltitudeRef": ("GPS", 0x0005),
+    "GPSAltitude": ("GPS", 0x0006),
+    "GPSTimeStamp": ("GPS", 0x0007),
+    "GPSDateStamp": ("GPS", 0x001D),
+}
+
+# Tags in IFD0 pointing to sub-IFDs
+_ifd_pointers = {"Exif": 0x8769, "GPS": 0x8825}
+
+# Size of one value of each TIFF field type
+_type_sizes = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+_type_formats = {1: "B", 3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 11: "f", 12: "d"}
+
+_tiff_headers = (b"MM\x00*", b"II*\x00")
+
+
+def _find_tiff_header(data):
+    """
+    Returns the offset of the TIFF header in an Exif block, either as in
+    HeifImage.metadata (optionally after "Exif\\0\\0") or as stored in the
+    HEIF file, where the first 4 bytes are the offset of the TIFF header.
+    """
+    candidates = [0, 6]
+    if len(data) >= 4:
+        candidates.append(4 + struct.unpack_from(">I", data, 0)[0])
+    for offset in candidates:
+        if bytes(data[offset : offset + 4]) in _tiff_headers:
+            return offset
+    return None
+
+
+def _resolve_tags(tags):
+    resolved = {}
+    for tag in tags:
+        if isinstance(tag, str):
+            if tag not in EXIF_TAGS:
+                raise KeyError(f"Unknown Exif tag {tag!r}, pass an (ifd, tag id) tuple")
+            resolved[tag] = EXIF_TAGS[tag]
+        else:
+            ifd, tag_id = tag
+            if ifd not in ("0th", "Exif", "GPS"):
+                raise ValueError(f"Unsupported IFD {ifd!r}, expected 0th, Exif or GPS")
+            resolved[tag] = (ifd, tag_id)
+    return resolved
+
+
+def _read_exif_tags(data, tags):
+    """
+    Decodes only the requested tags from an Exif block.
+
+    Walks the TIFF IFD structure directly in `data`, which can be any buffer,
+    without copying it and without decoding any other tags. Sub-IFDs are only
+    visited if a requested tag lives there. Tags are names from EXIF_TAGS or
+    (ifd, tag id) tuples. Missing and malformed tags are left out of the result.
+    """
+    wanted = _resolve_tags(tags)
+    base = _find_tiff_header(data)
+    if base is None or not wanted:
+        return {}
+
+    tiff = memoryview(data)[base:]
+    endian = ">" if bytes(tiff[:2]) == b"MM" else "<"
+
+    # {ifd: {tag id: [requested keys]}}
+    by_ifd = {}
+    for key, (ifd, tag_id) in wanted.items():
+        by_ifd.setdefault(ifd, {}).setdefault(tag_id, []).append(key)
+
+    result = {}
+    try:
+        (ifd0_offset,) = struct.unpack_from(endian + "I", tiff, 4)
+        wanted_ifd0 = dict(by_ifd.get("0th", {}))
+        for ifd in ("Exif", "GPS"):
+            if ifd in by_ifd:
+                wanted_ifd0[_ifd_pointers[ifd]] = []
+        entries = _read_ifd(tiff, endian, ifd0_offset, wanted_ifd0)
+    except struct.error:
+        return result
+
+    for ifd, ifd_tags in by_ifd.items():
+        if ifd != "0th":
+            pointer = entries.get(_ifd_pointers[ifd])
+            if not isinstance(pointer, int):
+                continue
+            try:
+                values = _read_ifd(tiff, endian, pointer, ifd_tags)
+            except struct.error:
+                continue
+        else:
+            values = entries
+        for tag_id, keys in ifd_tags.items():
+            if tag_id in values:
+                for key in keys:
+                    result[key] = values[tag_id]
+    return result
+
+
+def _read_ifd(tiff, endian, offset, wanted):
+    (count,) = struct.unpack_from(endian + "H", tiff, offset)
+    values = {}
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag_id, field_type, value_count = struct.unpack_from(endian + "HHI", tiff, entry)
+        if tag_id not in wanted:
+            continue
+        try:
+            values[tag_id] = _read_value(tiff, endian, entry, field_type, value_count)
+        except (struct.error, KeyError):
+            pass  # malformed entry, skip it
+    return values
+
+
+def _find_value_offset(tiff, endian, entry, field_type, value_count):
+    """Returns the offset of the value of an IFD entry within the TIFF data."""
+    if _type_sizes[field_type] * value_count <= 4:
+        return entry + 8
+    (offset,) = struct.unpack_from(endian + "I", tiff, entry + 8)
+    return offset
+
+
+def _read_value(tiff, endian, entry, field_type, value_count):
+    offset = _find_value_offset(tiff, endian, entry, field_type, value_count)
+    size = _type_sizes[field_type] * value_count
+    if offset + size > len(tiff):
+        raise struct.error("value out of range")
+
+    if field_type == 2:  # ASCII
+        return bytes(tiff[offset : offset + size]).split(b"\x00", 1)[0].decode(
+            "utf-8", "replace"
+        )
+    if field_type == 7:  # UNDEFINED
+        return bytes(tiff[offset : offset + size])
+    if field_type in (5, 10):  # RATIONAL, SRATIONAL
+        fmt = "I" if field_type == 5 else "i"
+        numbers = struct.unpack_from(f"{endian}{2 * value_count}{fmt}", tiff, offset)
+        values = tuple(zip(numbers[::2], numbers[1::2]))
+    else:
+        values = struct.unpack_from(
+            f"{endian}{value_count}{_type_formats[field_type]}", tiff, offset
+        )
+    return values[0] if value_count == 1 else values
+
+
+def _find_ifd0_value(data, tag_id):
+    """
+    Returns (offset, field type, count, byte order) of the value of an IFD0
+    tag within the Exif block `data`, or None if the tag is missing.
+    """
+    base = _find_tiff_header(data)
+    if base is None:
+        return None
+    tiff = memoryview(data)[base:]
+    endian = ">" if bytes(tiff[:2]) == b"MM" else "<"
+    try:
+        (ifd0_offset,) = struct.unpack_from(endian + "I", tiff, 4)
+        (count,) = struct.unpack_from(endian + "H", tiff, ifd0_offset)
+        for i in range(count):
+            entry = ifd0_offset + 2 + 12 * i
+            entry_tag, field_type, value_count = struct.unpack_from(
+                endian + "HHI", tiff, entry
+            )
+            if entry_tag == tag_id:
+                offset = _find_value_offset(tiff, endian, entry, field_type, value_count)
+                return base + offset, field_type, value_count, endian
+    except (struct.error, KeyError):
+        pass
+    return None
@@ -0,0 +1,96 @@
+import os
+import threading
+
+from _libheif_cffi import ffi, lib as libheif
+from . import constants as _constants
+from .error import _assert_success
+from .reader import read as _read
+
+
+# Tiny images decoded by init(preload_plugins=True), by compression format
+_warm_up_images = {
+    _constants.heif_compression_HEVC: "warmup.heic",
+    _constants.heif_compression_AV1: "warmup.avif",
+}
+
+_init_lock = threading.Lock()
+_init_count = 0
+
+
+def init(*, preload_plugins=True, plugin_directory=None):
+    """
+    Initialize libheif explicitly.
+
+    libheif initializes itself lazily on first use, and decoder libraries set
+    themselves up on their first decode. Calling init() up front moves this cost
+    to a point of your choosing, e.g. to a prefork server master before workers
+    are forked, so the workers inherit already initialized library state.
+
+    Calls are reference counted by libheif: every init() should be matched by
+    one deinit().
+
+    :param preload_plugins: also decode a tiny embedded HEVC and AV1 image,
+        for each format that has a decoder. This runs the one-time setup of
+        the decoder libraries and pages in their code, which otherwise happens
+        on the first decode in every worker.
+    :param plugin_directory: additionally load plugins from this directory.
+    """
+    global _init_count
+    with _init_lock:
+        error = libheif.heif_init(ffi.NULL)
+        _assert_success(error)
+        _init_count += 1
+
+        try:
+            if plugin_directory is not None:
+                p_loaded = ffi.new("int *")
+                error = libheif.heif_load_plugins(
+                    os.fsencode(plugin_directory), ffi.NULL, p_loaded, 0
+                )
+                _assert_success(error)
+
+            if preload_plugins:
+                _warm_up()
+        except BaseException:
+            # Don't leak the reference acquired above
+            libheif.heif_deinit()
+            _init_count -= 1
+            raise
+
+
+def _warm_up():
+    """Decodes the images in _warm_up_images which have a decoder available."""
+    data_path = os.path.dirname(os.path.abspath(__file__)) + "/data/"
+    for compression_format, filename in _warm_up_images.items():
+        if libheif.heif_get_decoder_descriptors(compression_format, ffi.NULL, 0):
+            _read(data_path + filename)
+
+
+def deinit():
+    """
+    Release one reference acquired by init().
+
+    Must not be called while any objects returned by pyheif are still in use.
+    Does nothing if init() was not called in this process or its parent.
+    """
+    global _init_count
+    with _init_lock:
+        if _init_count == 0:
+            return
+        libheif.heif_deinit()
+        _init_count -= 1
+
+
+# Fork safety: libheif keeps its plugin registry in ordinary process memory,
+# so a child forked after init() can decode right away without re-initializing.
+# The only hazard is forking while another thread is inside heif_init() or
+# heif_deinit(), which would leave libheif's internal init mutex locked
+# forever in the child. Holding _init_lock across fork() prevents that.
+# Calling init() again in the child is safe and just increments the refcount.
+# Forking while other threads are decoding is not supported.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=_init_lock.acquire,
+        after_in_parent=_init_lock.release,
+        after_in_child=_init_lock.release,
+    )
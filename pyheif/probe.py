@@ -0,0 +1,263 @@
+import builtins
+import mmap
+import pathlib
+
+from _libheif_cffi import ffi, lib as libheif
+from . import constants as _constants
+from .error import _assert_success
+from .exif import _read_exif_tags
+from .reader import (
+    _get_bytes,
+    _get_heif_context,
+    _imap,
+    _new_uninitialized,
+    _read_transformations,
+)
+
+
+class HeifProbe:
+    """
+    Header information of a HEIF file, as returned by probe_many().
+    Only the primary image is described, except for image_count.
+    If the file could not be parsed, error contains the message
+    and all other fields are zero.
+    """
+
+    __slots__ = (
+        "path",
+        "width",
+        "height",
+        "bit_depth",
+        "has_alpha",
+        "orientation",
+        "image_count",
+        "has_depth",
+        "has_auxiliary",
+        "has_exif",
+        "error",
+    )
+
+    def __init__(
+        self,
+        path,
+        width=0,
+        height=0,
+        bit_depth=0,
+        has_alpha=False,
+        orientation=0,
+        image_count=0,
+        has_depth=False,
+        has_auxiliary=False,
+        has_exif=False,
+        error=None,
+    ):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.has_alpha = has_alpha
+        self.orientation = orientation
+        self.image_count = image_count
+        self.has_depth = has_depth
+        self.has_auxiliary = has_auxiliary
+        self.has_exif = has_exif
+        self.error = error
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"<{self.__class__.__name__} {self.path} error={self.error!r}>"
+        return (
+            f"<{self.__class__.__name__} {self.path} {self.width}x{self.height} "
+            f"{self.bit_depth}bit{' alpha' if self.has_alpha else ''} "
+            f"orientation={self.orientation} images={self.image_count}>"
+        )
+
+
+# NumPy dtype used by probe_many(as_numpy=True), error becomes the `ok` flag
+PROBE_DTYPE = [
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("bit_depth", "i1"),
+    ("has_alpha", "?"),
+    ("orientation", "u1"),
+    ("image_count", "<u4"),
+    ("has_depth", "?"),
+    ("has_auxiliary", "?"),
+    ("has_exif", "?"),
+    ("ok", "?"),
+]
+
+
+def probe_many(paths, *, workers=None, as_numpy=False):
+    """
+    Read header information of many HEIF files with up to `workers` threads,
+    without decoding or copying any image data or metadata blocks.
+
+    Files given by path are memory mapped, so only the pages holding
+    the boxes libheif actually parses are read from disk.
+    Results are returned in input order, as a list of HeifProbe records
+    or as a NumPy structured array with PROBE_DTYPE if as_numpy is true.
+    Errors are reported in HeifProbe.error instead of being raised.
+    """
+    probes = _imap(_probe_safe, paths, workers)
+    if as_numpy:
+        return _probes_to_numpy(probes)
+    return list(probes)
+
+
+def read_exif(fp, tags):
+    """
+    Read only the requested Exif tags of the primary image, as a dict.
+
+    Like probe_many(), no image data is decoded and files given by path
+    are memory mapped. Only the Exif block of the primary image is copied
+    out of the file, and only the requested tags are decoded from it.
+    Tags are names from EXIF_TAGS or (ifd, tag id) tuples.
+    """
+    if isinstance(fp, (str, pathlib.Path)):
+        d = _map_file(fp)
+    else:
+        d = _get_bytes(fp)
+
+    try:
+        ctx = _get_heif_context(d)
+        try:
+            p_handle = ffi.new("struct heif_image_handle **")
+            error = libheif.heif_context_get_primary_image_handle(ctx, p_handle)
+            _assert_success(error)
+            handle = p_handle[0]
+            try:
+                exif = _read_exif_block(handle)
+            finally:
+                libheif.heif_image_handle_release(handle)
+        finally:
+            ffi.release(ctx)
+    finally:
+        _unmap_file(d)
+
+    if exif is None:
+        return {}
+    try:
+        return _read_exif_tags(ffi.buffer(exif), tags)
+    finally:
+        ffi.release(exif)
+
+
+def _read_exif_block(handle):
+    """
+    Returns the first Exif block of the handle as a native char array,
+    including the 4 bytes TIFF header offset, or None.
+    """
+    ids = ffi.new("heif_item_id[1]")
+    count = libheif.heif_image_handle_get_list_of_metadata_block_IDs(
+        handle, b"Exif", ids, 1
+    )
+    if count == 0:
+        return None
+    size = libheif.heif_image_handle_get_metadata_size(handle, ids[0])
+    p_data = _new_uninitialized("char[]", size)
+    error = libheif.heif_image_handle_get_metadata(handle, ids[0], p_data)
+    _assert_success(error)
+    return p_data
+
+
+def _probe_safe(fp):
+    try:
+        return _probe(fp)
+    except Exception as e:
+        return HeifProbe(_probe_path(fp), error=str(e))
+
+
+def _probe(fp):
+    if isinstance(fp, (str, pathlib.Path)):
+        d = _map_file(fp)
+    else:
+        d = _get_bytes(fp)
+
+    try:
+        return _probe_data(fp, d)
+    finally:
+        _unmap_file(d)
+
+
+def _probe_data(fp, d):
+    ctx = _get_heif_context(d)
+    try:
+        image_count = libheif.heif_context_get_number_of_top_level_images(ctx)
+        p_handle = ffi.new("struct heif_image_handle **")
+        error = libheif.heif_context_get_primary_image_handle(ctx, p_handle)
+        _assert_success(error)
+        handle = p_handle[0]
+        try:
+            return HeifProbe(
+                _probe_path(fp),
+                width=libheif.heif_image_handle_get_width(handle),
+                height=libheif.heif_image_handle_get_height(handle),
+                bit_depth=libheif.heif_image_handle_get_luma_bits_per_pixel(handle),
+                has_alpha=bool(libheif.heif_image_handle_has_alpha_channel(handle)),
+                orientation=_read_transformations(ctx, handle).orientation_tag,
+                image_count=image_count,
+                has_depth=bool(libheif.heif_image_handle_has_depth_image(handle)),
+                has_auxiliary=bool(
+                    libheif.heif_image_handle_get_number_of_auxiliary_images(
+                        handle,
+                        _constants.LIBHEIF_AUX_IMAGE_FILTER_OMIT_ALPHA
+                        | _constants.LIBHEIF_AUX_IMAGE_FILTER_OMIT_DEPTH,
+                    )
+                ),
+                has_exif=bool(
+                    libheif.heif_image_handle_get_number_of_metadata_blocks(
+                        handle, b"Exif"
+                    )
+                ),
+            )
+        finally:
+            libheif.heif_image_handle_release(handle)
+    finally:
+        # Free the context right away, so the file can be unmapped
+        ffi.release(ctx)
+
+
+def _probe_path(fp):
+    return fp if isinstance(fp, (str, pathlib.Path)) else None
+
+
+def _map_file(path):
+    with builtins.open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty or non-regular files can't be mapped
+            return f.read()
+
+
+def _unmap_file(d):
+    if isinstance(d, mmap.mmap):
+        try:
+            d.close()
+        except BufferError:
+            pass  # still exported to a context which failed to load, unmapped by GC
+
+
+def _probes_to_numpy(probes):
+    import numpy as np
+
+    result = np.zeros(1024, dtype=PROBE_DTYPE)
+    count = 0
+    for p in probes:
+        if count == len(result):
+            result = np.resize(result, 2 * len(result))
+        result[count] = (
+            p.width,
+            p.height,
+            p.bit_depth,
+            p.has_alpha,
+            p.orientation,
+            p.image_count,
+            p.has_depth,
+            p.has_auxiliary,
+            p.has_exif,
+            p.error is None,
+        )
+        count += 1
+    return result[:count].copy()
@@ -1,14 +1,61 @@
 import builtins
+import collections
 import functools
+import os
 import pathlib
+import pickle
+import sys
+import threading
 import warnings
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 
 from _libheif_cffi import ffi, lib as libheif
 from . import constants as _constants
+from .exif import _read_exif_tags
 from .transformations import Transformations
 from .error import _assert_success, HeifNoImageError
 
 
+# Layouts supported by the output_format option. "a" stands for premultiplied alpha.
+OUTPUT_FORMATS = ("RGB", "RGBA", "BGR", "BGRA", "RGBa", "BGRa")
+
+# Byte orders of 16-bit HDR output, "native" is the byte order of this machine
+HDR_BYTE_ORDERS = ("native", "little", "big")
+
+# Chroma upsampling algorithm and whether libheif must use it, per decode_quality.
+# None leaves libheif's default, which may pick a faster algorithm on its own.
+DECODE_QUALITY_PRESETS = {
+    "fast": ("nearest_neighbor", True),
+    "balanced": (None, None),
+    "best": ("bilinear", True),
+}
+
+_chroma_upsampling_algorithms = {
+    "nearest_neighbor": _constants.heif_chroma_upsampling_nearest_neighbor,
+    "bilinear": _constants.heif_chroma_upsampling_bilinear,
+}
+
+# Process-wide color conversion defaults, see set_decode_defaults()
+_decode_defaults = dict(
+    decode_quality=None,
+    chroma_upsampling=None,
+    only_use_preferred_chroma_algorithm=None,
+)
+
+# Attributes of decoded images which aren't pickled
+_transient_attributes = ("_load_lock", "_context_lock", "_reference")
+
+# Live native objects by type while tracking is on, see _track_native_objects()
+_native_objects = None
+
+# Pickle protocol 5 out-of-band buffers, Python 3.8+
+_PickleBuffer = getattr(pickle, "PickleBuffer", None)
+
+# Buffers for converted pixels are fully overwritten, don't zero them
+_new_uninitialized = ffi.new_allocator(should_clear_after_alloc=False)
+
+
 class HeifImage:
     def __init__(
         self, *, size, has_alpha, bit_depth, transformations, metadata, color_profile, data, stride
@@ -29,28 +76,216 @@ class HeifImage:
             f"with {str(len(self.data)) + ' bytes' if self.data else 'no'} data>"
         )
 
-    def load(self):
-        return self  # already loaded
+    @property
+    def dtype(self):
+        """
+        NumPy type string of the values in data: "|u1" for 8-bit images,
+        "<u2" or ">u2" for HDR images decoded with convert_hdr_to_8bit=False.
+        """
+        return _pixel_typestr(self)
+
+    def __reduce_ex__(self, protocol):
+        # With protocol 5 the pixel buffer is passed out-of-band, without a copy,
+        # older protocols (and Pythons before 3.8) get the pixels as bytes
+        state = self.__dict__.copy()
+        data = state.pop("data")
+        for name in _transient_attributes:
+            state.pop(name, None)
+        if data is not None:
+            if protocol >= 5 and _PickleBuffer is not None:
+                data = _PickleBuffer(data)
+            else:
+                data = bytes(data)
+        return _restore_heif_image, (data,), state
+
+    def load(self, *, output_format=None, **color_conversion_options):
+        # Already loaded, the options can't change anymore
+        _check_decoded_with(self, output_format, color_conversion_options)
+        return self
 
     def close(self):
         pass  # TODO: release self.data here?
 
+    def exif_tags(self, *tags):
+        """
+        Returns a dict with only the requested Exif tags that are present.
+        Tags are names from EXIF_TAGS or (ifd, tag id) tuples, with piexif's
+        IFD names. Doesn't decode any other tags and doesn't load the image.
+        """
+        for m in self.metadata or []:
+            if m["type"] == "Exif":
+                return _read_exif_tags(m["data"], tags)
+        return {}
+
+    def thumbnails(self):
+        """
+        Returns the thumbnails stored for this image as a list of undecoded
+        images with the same pixel format and decode options. Thumbnails can
+        only be read before the image itself is loaded, later the list is empty.
+        """
+        return _read_thumbnails(self)
+
+    def oriented_view(self):
+        """
+        Returns a HeifImageView of the cropped and oriented image.
+        Loads the image if it's not loaded yet.
+        """
+        return HeifImageView(self.load())
+
+    def load_pyramid(self, sizes):
+        """
+        Returns a list of HeifImage downscaled so that the longer side
+        matches each of `sizes`, in the same order. Images are never upscaled.
+
+        The image is decoded at most once and every level is computed from
+        the previous, larger one. Embedded thumbnails are decoded instead of
+        the full image for sizes they are big enough for. The full resolution
+        buffer of an undecoded image is released as soon as the largest level
+        is computed, and the image itself stays undecoded.
+        """
+        return _load_pyramid(self, sizes)
+
+
+class HeifImageView:
+    """
+    Zero-copy view of a loaded HeifImage with crop and orientation applied.
+
+    If the image was decoded with apply_transformations=False, the crop
+    and orientation from HeifImage.transformations are expressed as
+    an offset and (possibly negative or swapped) strides into the decoded
+    buffer, instead of being applied by libheif with a full-buffer pass.
+    Images decoded with transformations are viewed as is.
+
+    The view implements the NumPy array interface, so `numpy.asarray(view)`
+    gives a (height, width, channels) array sharing memory with the image.
+    Call `.copy()` on it when contiguous memory is needed.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self.mode = image.mode
+        self.bit_depth = image.bit_depth
+        self.dtype = image.dtype
+
+        channels = len(image.mode)
+        typestr = self.dtype
+        item_size = int(typestr[2:])
+        pixel_size = channels * item_size
+        row_size = image.stride
+
+        if getattr(image, "apply_transformations", True):
+            left, top, right, bottom = 0, 0, image.size[0], image.size[1]
+            orientation_tag = 1
+        else:
+            left, top, right, bottom = image.transformations.crop
+            orientation_tag = image.transformations.orientation_tag or 1
+        width, height = right - left, bottom - top
+        if not (0 <= left < right <= image.size[0] and 0 <= top < bottom <= image.size[1]):
+            raise ValueError(
+                f"Crop {image.transformations.crop} doesn't fit the image size {image.size}"
+            )
+        first = top * row_size + left * pixel_size
+        if first + (height - 1) * row_size + width * pixel_size > len(image.data):
+            raise ValueError("Image data is too short for its size and stride")
+        last_row = (height - 1) * row_size
+        last_col = (width - 1) * pixel_size
+
+        # Output (row, column) strides and offset of the first output pixel
+        # within the crop rectangle, for each EXIF orientation value
+        row_stride, col_stride, start = {
+            1: (row_size, pixel_size, 0),
+            2: (row_size, -pixel_size, last_col),
+            3: (-row_size, -pixel_size, last_row + last_col),
+            4: (-row_size, pixel_size, last_row),
+            5: (pixel_size, row_size, 0),
+            6: (pixel_size, -row_size, last_row),
+            7: (-pixel_size, -row_size, last_row + last_col),
+            8: (-pixel_size, row_size, last_col),
+        }[orientation_tag]
+        if orientation_tag >= 5:
+            width, height = height, width
+        self.size = (width, height)
+
+        address = int(ffi.cast("uintptr_t", ffi.from_buffer(image.data)))
+        offset = first + start
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": (height, width, channels),
+            "typestr": typestr,
+            "data": (address + offset, True),
+            "strides": (row_stride, col_stride, item_size),
+        }
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} {self.size[0]}x{self.size[1]} {self.mode} "
+            f"of {self.image!r}>"
+        )
+
 
 class UndecodedHeifImage(HeifImage):
     def __init__(
-        self, ctx, heif_handle, *, apply_transformations, convert_hdr_to_8bit, **kwargs
+        self,
+        ctx,
+        heif_handle,
+        *,
+        apply_transformations,
+        convert_hdr_to_8bit,
+        output_format=None,
+        hdr_byte_order="native",
+        decode_quality=None,
+        chroma_upsampling=None,
+        only_use_preferred_chroma_algorithm=None,
+        **kwargs
     ):
         self._ctx = ctx
         self._heif_handle = heif_handle
+        self._load_lock = threading.Lock()
+        # Shared by all images of a container, see _read_heif_container()
+        self._context_lock = threading.Lock()
         self.apply_transformations = apply_transformations
         self.convert_hdr_to_8bit = convert_hdr_to_8bit
+        self.output_format = _check_output_format(output_format)
+        self.hdr_byte_order = _check_hdr_byte_order(hdr_byte_order)
+        self.decode_quality = decode_quality
+        self.chroma_upsampling = chroma_upsampling
+        self.only_use_preferred_chroma_algorithm = only_use_preferred_chroma_algorithm
         super().__init__(data=None, stride=None, **kwargs)
+        if output_format:
+            self.mode = output_format
+
+    def __reduce_ex__(self, protocol):
+        # Pickled as a reference to the file, to be opened again on unpickling
+        reference = getattr(self, "_reference", None)
+        if reference is None:
+            raise TypeError(f"cannot pickle this {self.__class__.__name__}, load it first")
+        source, locator = reference
+        return _reopen_heif_image, (source, locator, _get_decode_options(self))
+
+    def load(self, *, output_format=None, **color_conversion_options):
+        # Concurrent calls decode only once, see HeifContainer.load_all()
+        with self._load_lock:
+            if self.data is not None:
+                # Decoded by another thread, self is a HeifImage now
+                return HeifImage.load(
+                    self, output_format=output_format, **color_conversion_options
+                )
+            if output_format:
+                self.output_format = _check_output_format(output_format)
+                self.mode = output_format
+            color_conversion_options = _check_color_conversion_options(
+                **color_conversion_options
+            )
+            for name, value in color_conversion_options.items():
+                if value is not None:
+                    setattr(self, name, value)
+            self._decode(self._heif_handle, self._context_lock)
+        return self
 
-    def load(self):
-        self.data, self.stride = _read_heif_image(self._heif_handle, self)
+    def _decode(self, handle, context_lock):
+        self.data, self.stride = _read_heif_image(handle, self, context_lock)
         self.close()
         self.__class__ = HeifImage
-        return self
 
     def close(self):
         # Don't call super().close() here, we don't need to free bytes.
@@ -58,6 +293,10 @@ class UndecodedHeifImage(HeifImage):
             del self._heif_handle
         if hasattr(self, "_ctx"):
             del self._ctx
+        # The reference may hold the whole file content, decoded images
+        # pickle their pixels instead
+        if hasattr(self, "_reference"):
+            del self._reference
 
 
 # This names are deprecated an will be removed in 1.0
@@ -70,6 +309,42 @@ class HeifContainer:
         self.primary_image = primary_image
         self.top_level_images = top_level_images
 
+    def load_all(self, workers=None, *, depth_images=False, auxiliary_images=False):
+        """
+        Loads all top-level images, and optionally their depth and auxiliary
+        images, in up to `workers` threads. Returns the container.
+
+        A heif_context must not be used by several threads at once, so the
+        images of a container decode one at a time when load() is called
+        on them from different threads. Metadata, color profiles and
+        transformations are read once when the container is opened; after
+        that only decoding and reading thumbnails touch the shared context,
+        and both take the container's lock. With more than one worker, every image
+        is decoded through its own heif_context over the same file data
+        instead, so decoding runs in parallel with the GIL released.
+        Each image is guarded by its own lock, so an image is never decoded
+        twice even if load() is called on it from several threads.
+        """
+        images = []
+        for top_level_image in self.top_level_images:
+            images.append(top_level_image.image)
+            if depth_images and top_level_image.depth_image is not None:
+                images.append(top_level_image.depth_image.image)
+            if auxiliary_images:
+                images.extend(aux.image for aux in top_level_image.auxiliary_images)
+        images = [image for image in images if image.data is None]
+
+        if workers is None:
+            workers = min(len(images), os.cpu_count() or 1)
+        load = _load_image
+        if workers > 1 and images and getattr(images[0], "_reference", None):
+            source = images[0]._reference[0]
+            data = _get_bytes(source) if isinstance(source, str) else source
+            load = functools.partial(_load_image_in_own_context, data=data)
+        for _ in _imap(load, images, workers):
+            pass
+        return self
+
 
 class HeifTopLevelImage:
     def __init__(self, id, image, is_primary, depth_image, auxiliary_images):
@@ -93,6 +368,19 @@ class HeifAuxiliaryImage:
         self.image = image
 
 
+def _load_image(heif_file):
+    return heif_file.load()
+
+
+def _load_image_in_own_context(heif_file, data):
+    with heif_file._load_lock:
+        if heif_file.data is None:
+            # No other thread uses this context, it needs no lock
+            ctx = _get_heif_context(data)
+            heif_file._decode(_find_handle(ctx, heif_file._reference[1]), None)
+    return heif_file
+
+
 def check(fp):
     magic = _get_bytes(fp, 12)
     filetype_check = libheif.heif_check_filetype(magic, len(magic))
@@ -104,28 +392,123 @@ def read_heif(fp, apply_transformations=True):
     return read(fp, apply_transformations=apply_transformations)
 
 
-def read(fp, *, apply_transformations=True, convert_hdr_to_8bit=True):
+def read_pyramid(
+    fp,
+    sizes,
+    *,
+    apply_transformations=True,
+    convert_hdr_to_8bit=True,
+    output_format=None,
+    hdr_byte_order="native",
+    decode_quality=None,
+    chroma_upsampling=None,
+    only_use_preferred_chroma_algorithm=None,
+):
+    heif_file = open(
+        fp,
+        apply_transformations=apply_transformations,
+        convert_hdr_to_8bit=convert_hdr_to_8bit,
+        output_format=output_format,
+        hdr_byte_order=hdr_byte_order,
+        decode_quality=decode_quality,
+        chroma_upsampling=chroma_upsampling,
+        only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
+    )
+    return heif_file.load_pyramid(sizes)
+
+
+def read(
+    fp,
+    *,
+    apply_transformations=True,
+    convert_hdr_to_8bit=True,
+    output_format=None,
+    hdr_byte_order="native",
+    decode_quality=None,
+    chroma_upsampling=None,
+    only_use_preferred_chroma_algorithm=None,
+):
     heif_file = open(
         fp,
         apply_transformations=apply_transformations,
         convert_hdr_to_8bit=convert_hdr_to_8bit,
+        output_format=output_format,
+        hdr_byte_order=hdr_byte_order,
+        decode_quality=decode_quality,
+        chroma_upsampling=chroma_upsampling,
+        only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
     )
     return heif_file.load()
 
 
-def open(fp, *, apply_transformations=True, convert_hdr_to_8bit=True):
+def open(
+    fp,
+    *,
+    apply_transformations=True,
+    convert_hdr_to_8bit=True,
+    output_format=None,
+    hdr_byte_order="native",
+    decode_quality=None,
+    chroma_upsampling=None,
+    only_use_preferred_chroma_algorithm=None,
+):
     heif_container = open_container(
         fp,
         apply_transformations=apply_transformations,
         convert_hdr_to_8bit=convert_hdr_to_8bit,
+        output_format=output_format,
+        hdr_byte_order=hdr_byte_order,
+        decode_quality=decode_quality,
+        chroma_upsampling=chroma_upsampling,
+        only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
     )
     return heif_container.primary_image.image
 
 
-def open_container(fp, *, apply_transformations=True, convert_hdr_to_8bit=True):
+def open_container(
+    fp,
+    *,
+    apply_transformations=True,
+    convert_hdr_to_8bit=True,
+    output_format=None,
+    hdr_byte_order="native",
+    decode_quality=None,
+    chroma_upsampling=None,
+    only_use_preferred_chroma_algorithm=None,
+):
     d = _get_bytes(fp)
     ctx = _get_heif_context(d)
-    return _read_heif_container(ctx, apply_transformations, convert_hdr_to_8bit)
+    # Undecoded images pickle as a reference to the path or the file content
+    source = os.path.abspath(fp) if isinstance(fp, (str, pathlib.Path)) else d
+    decode_options = dict(
+        apply_transformations=apply_transformations,
+        convert_hdr_to_8bit=convert_hdr_to_8bit,
+        output_format=_check_output_format(output_format),
+        hdr_byte_order=_check_hdr_byte_order(hdr_byte_order),
+        **_check_color_conversion_options(
+            decode_quality=decode_quality,
+            chroma_upsampling=chroma_upsampling,
+            only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
+        ),
+    )
+    return _read_heif_container(ctx, decode_options, source)
+
+
+def set_decode_defaults(
+    *, decode_quality=None, chroma_upsampling=None, only_use_preferred_chroma_algorithm=None
+):
+    """
+    Sets process-wide defaults for the color conversion options, used by
+    images which don't set them explicitly. Passing None resets an option
+    to libheif's default. Applies to all images decoded afterwards.
+    """
+    _decode_defaults.update(
+        _check_color_conversion_options(
+            decode_quality=decode_quality,
+            chroma_upsampling=chroma_upsampling,
+            only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
+        )
+    )
 
 
 def _get_bytes(fp, length=None):
@@ -140,6 +523,27 @@ def _get_bytes(fp, length=None):
     return d
 
 
+def _imap(func, iterable, workers, executor_class=ThreadPoolExecutor):
+    """
+    Ordered map over `iterable` with `workers` threads, keeping only a bounded
+    number of tasks in flight so arbitrarily long iterables can be consumed.
+    libheif calls release the GIL, so threads decode and parse in parallel.
+    A ProcessPoolExecutor can be passed as `executor_class` instead.
+    """
+    if not workers or workers <= 1:
+        yield from map(func, iterable)
+        return
+
+    with executor_class(max_workers=workers) as executor:
+        pending = collections.deque()
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def _keep_refs(destructor, **refs):
     """
     Keep refs to passed arguments until `inner` callback exist.
@@ -153,6 +557,44 @@ def _keep_refs(destructor, **refs):
     return inner
 
 
+def _track_native_objects():
+    """
+    Starts tracking the native libheif objects created from now on, for leak
+    tests. Also turned on by the PYHEIF_TRACK_NATIVE_OBJECTS environment variable.
+    """
+    global _native_objects
+    if _native_objects is None:
+        _native_objects = {
+            "heif_context": weakref.WeakSet(),
+            "heif_image_handle": weakref.WeakSet(),
+            "heif_image": weakref.WeakSet(),
+        }
+
+
+def _track_native(kind, cdata):
+    """
+    Registers cdata, which owns a native object through ffi.gc,
+    in _native_objects if tracking is on. Returns cdata.
+    """
+    if _native_objects is not None:
+        _native_objects[kind].add(cdata)
+    return cdata
+
+
+def _outstanding_native_objects():
+    """
+    Returns {type: count} of the tracked native libheif objects which haven't
+    been freed yet. Call gc.collect() first to free unreachable ones.
+    """
+    if _native_objects is None:
+        raise RuntimeError("Native objects aren't tracked, call _track_native_objects()")
+    return {kind: len(objects) for kind, objects in _native_objects.items()}
+
+
+if os.environ.get("PYHEIF_TRACK_NATIVE_OBJECTS"):
+    _track_native_objects()
+
+
 def _get_heif_context(d):
     magic = d[:12]
     filetype_check = libheif.heif_check_filetype(magic, len(magic))
@@ -161,19 +603,23 @@ def _get_heif_context(d):
     elif filetype_check == _constants.heif_filetype_yes_unsupported:
         warnings.warn("Input is an unsupported HEIF/AVIF file type - trying anyway!")
 
+    # mmap and other buffer objects have to be passed to libheif as cdata
+    mem = d if isinstance(d, bytes) else ffi.from_buffer(d)
+
     ctx = libheif.heif_context_alloc()
-    collect = _keep_refs(libheif.heif_context_free, data=d)
-    ctx = ffi.gc(ctx, collect, size=len(d))
+    collect = _keep_refs(libheif.heif_context_free, data=mem)
+    ctx = _track_native("heif_context", ffi.gc(ctx, collect, size=len(d)))
 
-    error = libheif.heif_context_read_from_memory_without_copy(ctx, d, len(d), ffi.NULL)
+    error = libheif.heif_context_read_from_memory_without_copy(ctx, mem, len(d), ffi.NULL)
     _assert_success(error)
     return ctx
 
 
-def _read_heif_container(ctx, apply_transformations, convert_hdr_to_8bit):
+def _read_heif_container(ctx, decode_options, source=None):
     image_count = libheif.heif_context_get_number_of_top_level_images(ctx)
     if image_count == 0:
         raise HeifNoImageError()
+    context_lock = threading.Lock()
 
     ids = ffi.new("heif_item_id[]", image_count)
     image_count = libheif.heif_context_get_list_of_top_level_image_IDs(
@@ -193,24 +639,31 @@ def _read_heif_container(ctx, apply_transformations, convert_hdr_to_8bit):
         _assert_success(error)
 
         collect = _keep_refs(libheif.heif_image_handle_release, ctx=ctx)
-        handle = ffi.gc(p_handle[0], collect)
+        handle = _track_native("heif_image_handle", ffi.gc(p_handle[0], collect))
 
-        image = _read_heif_handle(
-            ctx, handle, apply_transformations, convert_hdr_to_8bit
-        )
+        image = _read_heif_handle(ctx, handle, decode_options)
 
         is_primary = handle_id == primary_image_id
 
-        depth_image = _read_depth_image(
-            ctx, handle, apply_transformations, convert_hdr_to_8bit
-        )
-        auxiliary_images = _read_all_auxiliary_images(
-            ctx, handle, apply_transformations, convert_hdr_to_8bit
-        )
+        depth_image = _read_depth_image(ctx, handle, decode_options)
+        auxiliary_images = _read_all_auxiliary_images(ctx, handle, decode_options)
 
         top_level_image = HeifTopLevelImage(
             handle_id, image, is_primary, depth_image, auxiliary_images
         )
+        image._context_lock = context_lock
+        if depth_image is not None:
+            depth_image.image._context_lock = context_lock
+        for aux in auxiliary_images:
+            aux.image._context_lock = context_lock
+        if source is not None:
+            locator = (("top", handle_id),)
+            image._reference = (source, locator)
+            if depth_image is not None:
+                depth_locator = locator + (("depth", depth_image.id),)
+                depth_image.image._reference = (source, depth_locator)
+            for aux in auxiliary_images:
+                aux.image._reference = (source, locator + (("auxiliary", aux.id),))
 
         top_level_images.append(top_level_image)
         if is_primary:
@@ -219,8 +672,8 @@ def _read_heif_container(ctx, apply_transformations, convert_hdr_to_8bit):
     return HeifContainer(primary_image, top_level_images)
 
 
-def _read_heif_handle(ctx, handle, apply_transformations, convert_hdr_to_8bit):
-    if apply_transformations:
+def _read_heif_handle(ctx, handle, decode_options):
+    if decode_options["apply_transformations"]:
         width = libheif.heif_image_handle_get_width(handle)
         height = libheif.heif_image_handle_get_height(handle)
     else:
@@ -242,13 +695,12 @@ def _read_heif_handle(ctx, handle, apply_transformations, convert_hdr_to_8bit):
         transformations=transformations,
         metadata=metadata,
         color_profile=color_profile,
-        apply_transformations=apply_transformations,
-        convert_hdr_to_8bit=convert_hdr_to_8bit,
+        **decode_options,
     )
     return heif_file
 
 
-def _read_depth_image(ctx, handle, apply_transformations, convert_hdr_to_8bit):
+def _read_depth_image(ctx, handle, decode_options):
     has_depth_image = libheif.heif_image_handle_has_depth_image(handle)
     if has_depth_image:
         p_depth_image_id = ffi.new("heif_item_id *")
@@ -263,17 +715,17 @@ def _read_depth_image(ctx, handle, apply_transformations, convert_hdr_to_8bit):
             )
             _assert_success(error)
             collect = _keep_refs(libheif.heif_image_handle_release, handle=handle)
-            depth_handle = ffi.gc(p_depth_handle[0], collect)
+            depth_handle = _track_native(
+                "heif_image_handle", ffi.gc(p_depth_handle[0], collect)
+            )
             return HeifDepthImage(
                 depth_id,
-                _read_heif_handle(
-                    ctx, depth_handle, apply_transformations, convert_hdr_to_8bit
-                ),
+                _read_heif_handle(ctx, depth_handle, decode_options),
             )
     return None
 
 
-def _read_all_auxiliary_images(ctx, handle, apply_transformations, convert_hdr_to_8bit):
+def _read_all_auxiliary_images(ctx, handle, decode_options):
     aux_count = libheif.heif_image_handle_get_number_of_auxiliary_images(
         handle,
         _constants.LIBHEIF_AUX_IMAGE_FILTER_OMIT_ALPHA
@@ -291,16 +743,12 @@ def _read_all_auxiliary_images(ctx, handle, apply_transformations, convert_hdr_t
     )
     auxiliaries = []
     for aux_id in aux_ids:
-        aux_image = _read_auxiliary_image(
-            ctx, handle, aux_id, apply_transformations, convert_hdr_to_8bit
-        )
+        aux_image = _read_auxiliary_image(ctx, handle, aux_id, decode_options)
         auxiliaries.append(aux_image)
     return auxiliaries
 
 
-def _read_auxiliary_image(
-    ctx, handle, auxiliary_image_id, apply_transformations, convert_hdr_to_8bit
-):
+def _read_auxiliary_image(ctx, handle, auxiliary_image_id, decode_options):
     p_aux_handle = ffi.new("struct heif_image_handle **")
     error = libheif.heif_image_handle_get_auxiliary_image_handle(
         handle, auxiliary_image_id, p_aux_handle
@@ -308,7 +756,7 @@ def _read_auxiliary_image(
     _assert_success(error)
 
     collect = _keep_refs(libheif.heif_image_handle_release, handle=handle)
-    aux_handle = ffi.gc(p_aux_handle[0], collect)
+    aux_handle = _track_native("heif_image_handle", ffi.gc(p_aux_handle[0], collect))
 
     p_aux_type = ffi.new("char **")
     error = libheif.heif_image_handle_get_auxiliary_type(aux_handle, p_aux_type)
@@ -319,8 +767,240 @@ def _read_auxiliary_image(
     return HeifAuxiliaryImage(
         auxiliary_image_id,
         aux_type,
-        _read_heif_handle(ctx, aux_handle, apply_transformations, convert_hdr_to_8bit),
+        _read_heif_handle(ctx, aux_handle, decode_options),
+    )
+
+
+def _read_thumbnails(heif_file):
+    # The image lock keeps the handle from being closed by a concurrent
+    # load(), the context lock serializes use of the shared heif_context
+    with heif_file._load_lock, heif_file._context_lock:
+        if not hasattr(heif_file, "_heif_handle"):
+            return []
+        return _read_thumbnail_handles(heif_file)
+
+
+def _read_thumbnail_handles(heif_file):
+    handle = heif_file._heif_handle
+    count = libheif.heif_image_handle_get_number_of_thumbnails(handle)
+    if count == 0:
+        return []
+    ids = ffi.new("heif_item_id[]", count)
+    count = libheif.heif_image_handle_get_list_of_thumbnail_IDs(handle, ids, count)
+
+    # Thumbnails are decoded to the same pixel format as the main image
+    decode_options = _get_decode_options(heif_file)
+    decode_options["output_format"] = heif_file.mode
+
+    thumbnails = []
+    for thumbnail_id in ids:
+        p_thumbnail_handle = ffi.new("struct heif_image_handle **")
+        error = libheif.heif_image_handle_get_thumbnail(
+            handle, thumbnail_id, p_thumbnail_handle
+        )
+        _assert_success(error)
+        collect = _keep_refs(libheif.heif_image_handle_release, handle=handle)
+        thumbnail_handle = _track_native(
+            "heif_image_handle", ffi.gc(p_thumbnail_handle[0], collect)
+        )
+        thumbnail = _read_heif_handle(heif_file._ctx, thumbnail_handle, decode_options)
+        thumbnail._context_lock = heif_file._context_lock
+        if _pixel_typestr(thumbnail) == _pixel_typestr(heif_file):
+            reference = getattr(heif_file, "_reference", None)
+            if reference is not None:
+                source, locator = reference
+                thumbnail._reference = (source, locator + (("thumbnail", thumbnail_id),))
+            thumbnails.append(thumbnail)
+    return thumbnails
+
+
+def _load_pyramid(heif_file, sizes):
+    for size in sizes:
+        if size <= 0:
+            raise ValueError(f"Invalid size {size!r}, sizes must be positive")
+    full_size = max(heif_file.size)
+    pending = sorted(set(sizes), reverse=True)
+    levels = {}
+
+    # Every size is served by the smallest source that is at least as big
+    sources = [t for t in _read_thumbnails(heif_file) if max(t.size) < full_size]
+    sources.sort(key=lambda t: max(t.size))
+    sources.append(heif_file)
+
+    while sources:
+        # Pop sources so decoded thumbnails are released after use
+        source = sources.pop(0)
+        if source is heif_file:
+            served, pending = pending, []
+        else:
+            served = [size for size in pending if size <= max(source.size)]
+            pending = [size for size in pending if size > max(source.size)]
+        if not served:
+            continue
+
+        if source is heif_file and heif_file.data is None:
+            with heif_file._load_lock:
+                if heif_file.data is None:
+                    # Decode without attaching the full resolution data to heif_file
+                    data, stride = _read_heif_image(
+                        heif_file._heif_handle, heif_file, heif_file._context_lock
+                    )
+                else:
+                    data, stride = heif_file.data, heif_file.stride
+            current = _derived_heif_image(heif_file, heif_file.size, data, stride)
+            del data
+        else:
+            # Levels carry metadata of the main image, not of the thumbnail
+            source.load()
+            current = _derived_heif_image(heif_file, source.size, source.data, source.stride)
+        del source
+
+        for size in served:
+            target = _fit_size(heif_file.size, size)
+            if target != current.size:
+                current = _downscale_heif_image(current, target)
+            levels[size] = current
+
+    return [levels[size] for size in sizes]
+
+
+def _fit_size(size, max_size):
+    width, height = size
+    scale = max_size / max(width, height)
+    if scale >= 1:
+        return size
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _downscale_heif_image(heif_file, size):
+    width, height = size
+    channels = len(heif_file.mode)
+    typestr = _pixel_typestr(heif_file)
+    bytes_per_channel = int(typestr[2:])
+    stride = width * channels * bytes_per_channel
+    data_length = height * stride
+
+    p_dst = _new_uninitialized("uint8_t[]", data_length)
+    result = libheif.pyheif_downscale_box(
+        ffi.from_buffer(heif_file.data), heif_file.stride, *heif_file.size,
+        p_dst, stride, width, height,
+        channels, bytes_per_channel, int(typestr[0] == ">"),
+    )
+    if result != 0:
+        raise MemoryError()
+    return _derived_heif_image(heif_file, size, ffi.buffer(p_dst, data_length), stride)
+
+
+def _derived_heif_image(heif_file, size, data, stride):
+    transformations = heif_file.transformations
+    if size != heif_file.size and not getattr(heif_file, "apply_transformations", True):
+        # The crop applies to the scaled data
+        transformations = _scale_transformations(transformations, heif_file.size, size)
+    derived = HeifImage(
+        size=size,
+        has_alpha=heif_file.has_alpha,
+        bit_depth=heif_file.bit_depth,
+        transformations=transformations,
+        metadata=heif_file.metadata,
+        color_profile=heif_file.color_profile,
+        data=data,
+        stride=stride,
     )
+    derived.mode = heif_file.mode
+    for name, value in _get_decode_options(heif_file).items():
+        setattr(derived, name, value)
+    return derived
+
+
+def _scale_transformations(transformations, size, scaled_size):
+    """
+    Returns a copy of transformations for an untransformed image of `size`
+    scaled to `scaled_size`, with the crop rectangle scaled to match.
+    """
+    scaled = Transformations(*scaled_size)
+    scaled.orientation_tag = transformations.orientation_tag
+    left, top, right, bottom = transformations.crop
+    scale_x = scaled_size[0] / size[0]
+    scale_y = scaled_size[1] / size[1]
+    left = min(int(left * scale_x), scaled_size[0] - 1)
+    top = min(int(top * scale_y), scaled_size[1] - 1)
+    scaled.crop = (
+        left,
+        top,
+        max(left + 1, min(round(right * scale_x), scaled_size[0])),
+        max(top + 1, min(round(bottom * scale_y), scaled_size[1])),
+    )
+    return scaled
+
+
+def _get_decode_options(heif_file):
+    return dict(
+        apply_transformations=getattr(heif_file, "apply_transformations", True),
+        convert_hdr_to_8bit=getattr(heif_file, "convert_hdr_to_8bit", True),
+        output_format=getattr(heif_file, "output_format", None),
+        hdr_byte_order=getattr(heif_file, "hdr_byte_order", "big"),
+        decode_quality=getattr(heif_file, "decode_quality", None),
+        chroma_upsampling=getattr(heif_file, "chroma_upsampling", None),
+        only_use_preferred_chroma_algorithm=getattr(
+            heif_file, "only_use_preferred_chroma_algorithm", None
+        ),
+    )
+
+
+def _restore_heif_image(data):
+    heif_file = HeifImage.__new__(HeifImage)
+    if data is not None:
+        # Keep the unpickled (possibly out-of-band) buffer, don't copy it
+        data = ffi.buffer(ffi.from_buffer(data))
+    heif_file.data = data
+    return heif_file
+
+
+def _reopen_heif_image(source, locator, decode_options):
+    container = open_container(source, **decode_options)
+    parent = container
+    for kind, item_id in locator:
+        if kind == "top":
+            parent = _find_by_id(parent.top_level_images, item_id)
+        elif kind == "depth":
+            parent = _find_by_id([parent.depth_image], item_id)
+        elif kind == "auxiliary":
+            parent = _find_by_id(parent.auxiliary_images, item_id)
+        elif kind == "thumbnail":
+            thumbnails = _read_thumbnails(parent.image)
+            ids = [t._reference[1][-1][1] for t in thumbnails]
+            if item_id not in ids:
+                raise ValueError(f"Image {item_id} not found")
+            return thumbnails[ids.index(item_id)]
+    return parent.image
+
+
+def _find_handle(ctx, locator):
+    """Returns the handle of the image at `locator`, see _read_heif_container()."""
+    handle = None
+    for kind, item_id in locator:
+        p_handle = ffi.new("struct heif_image_handle **")
+        if kind == "top":
+            error = libheif.heif_context_get_image_handle(ctx, item_id, p_handle)
+        elif kind == "depth":
+            error = libheif.heif_image_handle_get_depth_image_handle(handle, item_id, p_handle)
+        elif kind == "auxiliary":
+            error = libheif.heif_image_handle_get_auxiliary_image_handle(
+                handle, item_id, p_handle
+            )
+        else:
+            error = libheif.heif_image_handle_get_thumbnail(handle, item_id, p_handle)
+        _assert_success(error)
+        collect = _keep_refs(libheif.heif_image_handle_release, parent=handle, ctx=ctx)
+        handle = _track_native("heif_image_handle", ffi.gc(p_handle[0], collect))
+    return handle
+
+
+def _find_by_id(items, item_id):
+    for item in items:
+        if item is not None and item.id == item_id:
+            return item
+    raise ValueError(f"Image {item_id} not found")
 
 
 def _read_transformations(ctx, handle):
@@ -420,15 +1100,25 @@ def _read_color_profile(handle):
     return color_profile
 
 
-def _read_heif_image(handle, heif_file):
+def _read_heif_image(handle, heif_file, context_lock):
+    if heif_file.output_format:
+        has_alpha = len(heif_file.output_format) == 4
+    else:
+        has_alpha = heif_file.has_alpha
+
     colorspace = _constants.heif_colorspace_RGB
     if heif_file.convert_hdr_to_8bit or heif_file.bit_depth <= 8:
-        if heif_file.has_alpha:
+        if has_alpha:
             chroma = _constants.heif_chroma_interleaved_RGBA
         else:
             chroma = _constants.heif_chroma_interleaved_RGB
+    elif heif_file.hdr_byte_order == "little":
+        if has_alpha:
+            chroma = _constants.heif_chroma_interleaved_RRGGBBAA_LE
+        else:
+            chroma = _constants.heif_chroma_interleaved_RRGGBB_LE
     else:
-        if heif_file.has_alpha:
+        if has_alpha:
             chroma = _constants.heif_chroma_interleaved_RRGGBBAA_BE
         else:
             chroma = _constants.heif_chroma_interleaved_RRGGBB_BE
@@ -437,11 +1127,20 @@ def _read_heif_image(handle, heif_file):
     p_options = ffi.gc(p_options, libheif.heif_decoding_options_free)
     p_options.ignore_transformations = int(not heif_file.apply_transformations)
     p_options.convert_hdr_to_8bit = int(heif_file.convert_hdr_to_8bit)
+    if p_options.version >= 5:
+        _set_color_conversion_options(p_options.color_conversion_options, heif_file)
 
     p_img = ffi.new("struct heif_image **")
-    error = libheif.heif_decode_image(
-        handle, p_img, colorspace, chroma, p_options,
-    )
+    # Decoding reads the file data through the handle's heif_context
+    if context_lock is not None:
+        context_lock.acquire()
+    try:
+        error = libheif.heif_decode_image(
+            handle, p_img, colorspace, chroma, p_options,
+        )
+    finally:
+        if context_lock is not None:
+            context_lock.release()
     _assert_success(error)
 
     img = p_img[0]
@@ -452,11 +1151,17 @@ def _read_heif_image(handle, heif_file):
     )
     stride = p_stride[0]
 
+    if heif_file.output_format or libheif.heif_image_is_premultiplied_alpha(img):
+        converted = _convert_heif_image(img, p_data, stride, heif_file)
+        if converted is not None:
+            libheif.heif_image_release(img)
+            return converted
+
     data_length = heif_file.size[1] * stride
 
     # Release image as soon as no references to p_data left
     collect = functools.partial(_release_heif_image, img)
-    p_data = ffi.gc(p_data, collect, size=data_length)
+    p_data = _track_native("heif_image", ffi.gc(p_data, collect, size=data_length))
 
     # ffi.buffer obligatory keeps a reference to p_data
     data_buffer = ffi.buffer(p_data, data_length)
@@ -464,5 +1169,129 @@ def _read_heif_image(handle, heif_file):
     return data_buffer, stride
 
 
+def _convert_heif_image(img, p_data, stride, heif_file):
+    """
+    Converts decoded interleaved RGB(A) data to heif_file.output_format
+    with tightly packed rows in a single native pass. Colors of images with
+    premultiplied alpha are divided by alpha, unless "RGBa" or "BGRa" is
+    requested. Returns None if the decoded data is already in the requested layout.
+    """
+    output_format = heif_file.output_format or heif_file.mode
+    width, height = heif_file.size
+    channels = len(output_format)
+    typestr = _pixel_typestr(heif_file)
+    bytes_per_channel = int(typestr[2:])
+    max_value = 255 if bytes_per_channel == 1 else (1 << heif_file.bit_depth) - 1
+    packed_stride = width * channels * bytes_per_channel
+
+    swap_rb = output_format.startswith("B")
+    # 1 premultiplies, -1 restores straight alpha, 0 keeps what libheif delivers
+    premultiplied = bool(libheif.heif_image_is_premultiplied_alpha(img))
+    premultiply = int(output_format.endswith("a")) - int(premultiplied)
+    if channels != 4:
+        premultiply = 0
+    if not swap_rb and not premultiply and (
+        stride == packed_stride or not heif_file.output_format
+    ):
+        return None
+
+    data_length = height * packed_stride
+    p_dst = _new_uninitialized("uint8_t[]", data_length)
+    libheif.pyheif_convert_interleaved(
+        p_data, stride, p_dst, packed_stride,
+        width, height, channels,
+        bytes_per_channel, int(typestr[0] == ">"), max_value,
+        int(swap_rb), premultiply,
+    )
+    return ffi.buffer(p_dst, data_length), packed_stride
+
+
+def _set_color_conversion_options(options, heif_file):
+    # Image options override process-wide defaults,
+    # and explicit fields override the decode_quality preset
+    upsampling = only_use_preferred = None
+    for source in (_decode_defaults, _get_decode_options(heif_file)):
+        if source["decode_quality"] is not None:
+            upsampling, only_use_preferred = DECODE_QUALITY_PRESETS[source["decode_quality"]]
+        if source["chroma_upsampling"] is not None:
+            upsampling = source["chroma_upsampling"]
+        if source["only_use_preferred_chroma_algorithm"] is not None:
+            only_use_preferred = source["only_use_preferred_chroma_algorithm"]
+
+    if upsampling is not None:
+        options.preferred_chroma_upsampling_algorithm = _chroma_upsampling_algorithms[
+            upsampling
+        ]
+    if only_use_preferred is not None:
+        options.only_use_preferred_chroma_algorithm = int(only_use_preferred)
+
+
+def _check_color_conversion_options(
+    *, decode_quality=None, chroma_upsampling=None, only_use_preferred_chroma_algorithm=None
+):
+    if decode_quality is not None and decode_quality not in DECODE_QUALITY_PRESETS:
+        raise ValueError(
+            f"Unsupported decode_quality {decode_quality!r}, "
+            f"expected one of {', '.join(DECODE_QUALITY_PRESETS)}"
+        )
+    if chroma_upsampling is not None and chroma_upsampling not in _chroma_upsampling_algorithms:
+        raise ValueError(
+            f"Unsupported chroma_upsampling {chroma_upsampling!r}, "
+            f"expected one of {', '.join(_chroma_upsampling_algorithms)}"
+        )
+    return dict(
+        decode_quality=decode_quality,
+        chroma_upsampling=chroma_upsampling,
+        only_use_preferred_chroma_algorithm=only_use_preferred_chroma_algorithm,
+    )
+
+
+def _check_decoded_with(heif_file, output_format, color_conversion_options):
+    """
+    Raises ValueError if load() options differ from the ones
+    the already decoded heif_file was decoded with.
+    """
+    requested = _check_color_conversion_options(**color_conversion_options)
+    requested["output_format"] = _check_output_format(output_format)
+    decoded = _get_decode_options(heif_file)
+    decoded["output_format"] = heif_file.mode
+    for name, value in requested.items():
+        if value is not None and value != decoded[name]:
+            raise ValueError(
+                f"Image is already decoded with {name}={decoded[name]!r}, "
+                f"can't load it with {name}={value!r}"
+            )
+
+
+def _check_output_format(output_format):
+    if output_format is not None and output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported output_format {output_format!r}, "
+            f"expected one of {', '.join(OUTPUT_FORMATS)}"
+        )
+    return output_format
+
+
+def _check_hdr_byte_order(hdr_byte_order):
+    """Validates hdr_byte_order, returns "little" or "big"."""
+    if hdr_byte_order not in HDR_BYTE_ORDERS:
+        raise ValueError(
+            f"Invalid hdr_byte_order {hdr_byte_order!r}, "
+            f"expected one of {', '.join(HDR_BYTE_ORDERS)}"
+        )
+    if hdr_byte_order == "native":
+        return sys.byteorder
+    return hdr_byte_order
+
+
+def _pixel_typestr(heif_file):
+    if getattr(heif_file, "convert_hdr_to_8bit", True) or heif_file.bit_depth <= 8:
+        return "|u1"
+    # Images from before hdr_byte_order existed are big-endian
+    if getattr(heif_file, "hdr_byte_order", "big") == "little":
+        return "<u2"
+    return ">u2"
+
+
 def _release_heif_image(img, p_data=None):
     libheif.heif_image_release(img)
@@ -1,2 +1,587 @@
+import builtins
+import os
+import pathlib
+import struct
+
+from . import constants as _constants
+from .exif import _find_ifd0_value
+from .probe import _map_file
+from .reader import _get_bytes
+from .transformations import Transformations
+
+
 def write():
     raise Exception("not implemented")
+
+
+# Metadata item kinds accepted by rewrite(drop_metadata=...)
+_metadata_kinds = ("Exif", "XMP", "mime")
+
+_xmp_content_type = b"application/rdf+xml"
+
+_exif_orientation_tag = 0x0112
+
+
+def rewrite(fp, out, *, drop_metadata=(), set_orientation=None):
+    """
+    Writes a copy of the HEIF file `fp` to `out`, a path or a writable
+    file object, with metadata removed or the orientation changed.
+    No image is decoded or re-encoded.
+
+    `drop_metadata` lists the metadata items to remove: "Exif", "XMP"
+    or "mime" (all MIME items, XMP included). Their entries are removed
+    from the meta box and their data is overwritten with zeros.
+
+    `set_orientation` is an EXIF orientation (1 to 8) for the primary image,
+    which replaces the rotation and mirror properties of the primary image,
+    its thumbnails and their auxiliary (alpha, depth) images.
+    The Orientation tag of the primary image's Exif is updated to match.
+
+    Only the meta box is rewritten, everything else is copied byte for byte.
+    If the new meta box is smaller, it's padded with a free box. If it's
+    bigger, the data after it is moved and item offsets are updated, which
+    is not supported for image sequences.
+    """
+    for kind in drop_metadata:
+        if kind not in _metadata_kinds:
+            raise ValueError(
+                f"Invalid metadata {kind!r}, expected one of {', '.join(_metadata_kinds)}"
+            )
+    if set_orientation is not None and set_orientation not in range(1, 9):
+        raise ValueError(f"Invalid orientation {set_orientation!r}, expected 1 to 8")
+
+    if isinstance(fp, (str, pathlib.Path)):
+        if isinstance(out, (str, pathlib.Path)) and os.path.exists(out):
+            if os.path.samefile(fp, out):
+                raise ValueError("Can't rewrite a file in place")
+        data = memoryview(_map_file(fp))
+    else:
+        data = memoryview(_get_bytes(fp))
+
+    boxes = list(_iter_boxes(data, 0, len(data)))
+    meta_boxes = [box for box in boxes if box[0] == b"meta"]
+    if not meta_boxes:
+        raise ValueError("Input is not a HEIF/AVIF file, it has no meta box")
+    _, meta_start, meta_header, meta_size = meta_boxes[0]
+    meta_end = meta_start + meta_size
+    meta = _read_meta(data[meta_start + meta_header : meta_end])
+
+    # Changes to file data outside of the meta box, as (offset, bytes)
+    patches = []
+    if drop_metadata:
+        _drop_metadata(meta, data, drop_metadata, patches)
+    if set_orientation is not None:
+        _set_orientation(meta, data, set_orientation, patches)
+
+    new_meta = _write_meta(meta, meta_end, 0)
+    padding = meta_size - len(new_meta)
+    shift = 0
+    if padding and padding < 8:
+        # Move everything after the meta box, the offsets may need more bytes
+        padding = 0
+        while shift != len(new_meta) - meta_size:
+            shift = len(new_meta) - meta_size
+            new_meta = _write_meta(meta, meta_end, shift)
+        if any(box[0] == b"moov" and box[1] >= meta_end for box in boxes):
+            raise ValueError("Can't grow the meta box of an image sequence")
+
+    if isinstance(out, (str, pathlib.Path)):
+        with builtins.open(out, "wb") as f:
+            _write_file(f, data, meta_start, meta_end, new_meta, padding, patches)
+    else:
+        _write_file(out, data, meta_start, meta_end, new_meta, padding, patches)
+
+
+def _write_file(f, data, meta_start, meta_end, new_meta, padding, patches):
+    patches.sort(key=lambda patch: patch[0])
+    _write_patched(f, data, 0, meta_start, patches)
+    f.write(new_meta)
+    if padding:
+        f.write(struct.pack(">I4s", padding, b"free") + bytes(padding - 8))
+    _write_patched(f, data, meta_end, len(data), patches)
+
+
+def _write_patched(f, data, start, end, patches):
+    for offset, value in patches:
+        if offset < start or offset + len(value) > end:
+            continue
+        f.write(data[start:offset])
+        f.write(value)
+        start = offset + len(value)
+    f.write(data[start:end])
+
+
+def _iter_boxes(data, start, end):
+    """Yields (type, offset, header size, size) of the boxes in data[start:end]."""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, offset + 8)
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError(f"Invalid {box_type.decode('latin-1')!r} box size")
+        yield box_type, offset, header, size
+        offset += size
+
+
+def _box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type, version, flags, payload):
+    return _box(box_type, struct.pack(">I", version << 24 | flags) + payload)
+
+
+def _read_full_box_header(payload):
+    (value,) = struct.unpack_from(">I", payload, 0)
+    return value >> 24, value & 0xFFFFFF
+
+
+def _read_uint(payload, offset, size):
+    if size == 0:
+        return 0, offset
+    fmt = {2: ">H", 4: ">I", 8: ">Q"}[size]
+    return struct.unpack_from(fmt, payload, offset)[0], offset + size
+
+
+def _write_uint(value, size):
+    if size == 0:
+        return b""
+    return struct.pack({2: ">H", 4: ">I", 8: ">Q"}[size], value)
+
+
+def _read_meta(payload):
+    """
+    Parses the payload of the meta box into a dict. Boxes which rewrite()
+    changes are parsed, the others are kept as bytes.
+    """
+    meta = {"header": bytes(payload[:4]), "children": [], "pitm": None}
+    for box_type, offset, header, size in _iter_boxes(payload, 4, len(payload)):
+        box_payload = payload[offset + header : offset + size]
+        if box_type == b"iinf":
+            meta["iinf"] = _read_iinf(box_payload)
+        elif box_type == b"iloc":
+            meta["iloc"] = _read_iloc(box_payload)
+        elif box_type == b"iref":
+            meta["iref"] = _read_iref(box_payload)
+        elif box_type == b"iprp":
+            meta["iprp"] = _read_iprp(box_payload)
+        elif box_type == b"idat":
+            meta["idat"] = bytearray(box_payload)
+        else:
+            if box_type == b"pitm":
+                version, _ = _read_full_box_header(box_payload)
+                meta["pitm"], _ = _read_uint(box_payload, 4, 2 if version == 0 else 4)
+            meta["children"].append((box_type, bytes(payload[offset : offset + size])))
+            continue
+        meta["children"].append((box_type, None))
+    for box_type in (b"iinf", b"iloc"):
+        if box_type.decode() not in meta:
+            raise ValueError(f"Invalid HEIF file, it has no {box_type.decode()} box")
+    return meta
+
+
+def _read_iinf(payload):
+    version, flags = _read_full_box_header(payload)
+    _, offset = _read_uint(payload, 4, 2 if version == 0 else 4)
+    items = []
+    for _, box_offset, header, size in _iter_boxes(payload, offset, len(payload)):
+        infe = bytes(payload[box_offset : box_offset + size])
+        item = {"box": infe, "id": None, "type": None, "content_type": None}
+        infe_version, _ = _read_full_box_header(infe[header:])
+        if infe_version >= 2:
+            position = header + 4
+            item["id"], position = _read_uint(infe, position, 2 if infe_version == 2 else 4)
+            item["type"] = infe[position + 2 : position + 6]
+            if item["type"] == b"mime":
+                name_end = infe.index(b"\0", position + 6)
+                item["content_type"] = infe[name_end + 1 :].split(b"\0", 1)[0]
+        items.append(item)
+    return {"version": version, "flags": flags, "items": items}
+
+
+def _write_iinf(iinf):
+    count = _write_uint(len(iinf["items"]), 2 if iinf["version"] == 0 else 4)
+    entries = b"".join(item["box"] for item in iinf["items"])
+    return _full_box(b"iinf", iinf["version"], iinf["flags"], count + entries)
+
+
+def _read_iloc(payload):
+    version, flags = _read_full_box_header(payload)
+    offset_size, length_size = payload[4] >> 4, payload[4] & 0xF
+    base_offset_size = payload[5] >> 4
+    index_size = payload[5] & 0xF if version in (1, 2) else 0
+    count, position = _read_uint(payload, 6, 2 if version < 2 else 4)
+    items = []
+    for _ in range(count):
+        item_id, position = _read_uint(payload, position, 2 if version < 2 else 4)
+        construction_method = 0
+        if version in (1, 2):
+            construction_method, position = _read_uint(payload, position, 2)
+            construction_method &= 0xF
+        data_reference_index, position = _read_uint(payload, position, 2)
+        base_offset, position = _read_uint(payload, position, base_offset_size)
+        extent_count, position = _read_uint(payload, position, 2)
+        extents = []
+        for _ in range(extent_count):
+            extent_index, position = _read_uint(payload, position, index_size)
+            extent_offset, position = _read_uint(payload, position, offset_size)
+            extent_length, position = _read_uint(payload, position, length_size)
+            extents.append([extent_index, extent_offset, extent_length])
+        items.append(
+            {
+                "id": item_id,
+                "construction_method": construction_method,
+                "data_reference_index": data_reference_index,
+                "base_offset": base_offset,
+                "extents": extents,
+            }
+        )
+    return {
+        "version": version,
+        "flags": flags,
+        "offset_size": offset_size,
+        "length_size": length_size,
+        "base_offset_size": base_offset_size,
+        "index_size": index_size,
+        "items": items,
+    }
+
+
+def _write_iloc(iloc, meta_end, shift):
+    """
+    Serializes iloc, moving file offsets at or after meta_end by `shift`.
+    Offset fields are widened if the moved offsets don't fit anymore.
+    """
+    items = []
+    for item in iloc["items"]:
+        base_offset = item["base_offset"]
+        extents = [list(extent) for extent in item["extents"]]
+        if shift and item["construction_method"] == 0 and item["data_reference_index"] == 0:
+            if base_offset and base_offset >= meta_end:
+                base_offset += shift
+            else:
+                for extent in extents:
+                    if base_offset + extent[1] >= meta_end:
+                        extent[1] += shift
+        items.append((item, base_offset, extents))
+
+    def field_size(size, values):
+        if any(value >= 1 << 32 for value in values):
+            return 8
+        if size == 0 and any(values):
+            return 4
+        return size
+
+    version = iloc["version"]
+    offset_size = field_size(
+        iloc["offset_size"], [extent[1] for _, _, extents in items for extent in extents]
+    )
+    base_offset_size = field_size(
+        iloc["base_offset_size"], [base_offset for _, base_offset, _ in items]
+    )
+    length_size, index_size = iloc["length_size"], iloc["index_size"]
+
+    payload = [
+        bytes([offset_size << 4 | length_size, base_offset_size << 4 | index_size]),
+        _write_uint(len(items), 2 if version < 2 else 4),
+    ]
+    for item, base_offset, extents in items:
+        payload.append(_write_uint(item["id"], 2 if version < 2 else 4))
+        if version in (1, 2):
+            payload.append(_write_uint(item["construction_method"], 2))
+        payload.append(_write_uint(item["data_reference_index"], 2))
+        payload.append(_write_uint(base_offset, base_offset_size))
+        payload.append(_write_uint(len(extents), 2))
+        for extent_index, extent_offset, extent_length in extents:
+            payload.append(_write_uint(extent_index, index_size))
+            payload.append(_write_uint(extent_offset, offset_size))
+            payload.append(_write_uint(extent_length, length_size))
+    return _full_box(b"iloc", version, iloc["flags"], b"".join(payload))
+
+
+def _read_iref(payload):
+    version, flags = _read_full_box_header(payload)
+    id_size = 2 if version == 0 else 4
+    references = []
+    for box_type, offset, header, size in _iter_boxes(payload, 4, len(payload)):
+        from_id, position = _read_uint(payload, offset + header, id_size)
+        count, position = _read_uint(payload, position, 2)
+        to_ids = []
+        for _ in range(count):
+            to_id, position = _read_uint(payload, position, id_size)
+            to_ids.append(to_id)
+        references.append([box_type, from_id, to_ids])
+    return {"version": version, "flags": flags, "references": references}
+
+
+def _write_iref(iref):
+    id_size = 2 if iref["version"] == 0 else 4
+    boxes = []
+    for box_type, from_id, to_ids in iref["references"]:
+        payload = _write_uint(from_id, id_size) + _write_uint(len(to_ids), 2)
+        payload += b"".join(_write_uint(to_id, id_size) for to_id in to_ids)
+        boxes.append(_box(box_type, payload))
+    return _full_box(b"iref", iref["version"], iref["flags"], b"".join(boxes))
+
+
+def _read_iprp(payload):
+    iprp = {"children": [], "properties": [], "associations": []}
+    for box_type, offset, header, size in _iter_boxes(payload, 0, len(payload)):
+        box_payload = payload[offset + header : offset + size]
+        if box_type == b"ipco":
+            iprp["properties"] = [
+                bytes(box_payload[o : o + s])
+                for _, o, _, s in _iter_boxes(box_payload, 0, len(box_payload))
+            ]
+        elif box_type == b"ipma":
+            iprp["associations"].append(_read_ipma(box_payload))
+        else:
+            iprp["children"].append((box_type, bytes(payload[offset : offset + size])))
+            continue
+        iprp["children"].append((box_type, None))
+    return iprp
+
+
+def _write_iprp(iprp):
+    children = []
+    ipma = iter(iprp["associations"])
+    for box_type, box in iprp["children"]:
+        if box_type == b"ipco":
+            box = _box(b"ipco", b"".join(iprp["properties"]))
+        elif box_type == b"ipma":
+            box = _write_ipma(next(ipma))
+        children.append(box)
+    return _box(b"iprp", b"".join(children))
+
+
+def _read_ipma(payload):
+    version, flags = _read_full_box_header(payload)
+    count, position = _read_uint(payload, 4, 4)
+    entries = []
+    for _ in range(count):
+        item_id, position = _read_uint(payload, position, 2 if version < 1 else 4)
+        association_count = payload[position]
+        position += 1
+        associations = []
+        for _ in range(association_count):
+            if flags & 1:
+                value, position = _read_uint(payload, position, 2)
+                associations.append((value >> 15, value & 0x7FFF))
+            else:
+                value = payload[position]
+                position += 1
+                associations.append((value >> 7, value & 0x7F))
+        entries.append([item_id, associations])
+    return {"version": version, "flags": flags, "entries": entries}
+
+
+def _write_ipma(ipma):
+    flags = ipma["flags"]
+    if any(index > 0x7F for _, associations in ipma["entries"] for _, index in associations):
+        flags |= 1
+    payload = [_write_uint(len(ipma["entries"]), 4)]
+    for item_id, associations in ipma["entries"]:
+        payload.append(_write_uint(item_id, 2 if ipma["version"] < 1 else 4))
+        payload.append(bytes([len(associations)]))
+        for essential, index in associations:
+            if flags & 1:
+                payload.append(_write_uint(essential << 15 | index, 2))
+            else:
+                payload.append(bytes([essential << 7 | index]))
+    return _full_box(b"ipma", ipma["version"], flags, b"".join(payload))
+
+
+def _write_meta(meta, meta_end, shift):
+    children = []
+    for box_type, box in meta["children"]:
+        if box_type == b"iinf":
+            box = _write_iinf(meta["iinf"])
+        elif box_type == b"iloc":
+            box = _write_iloc(meta["iloc"], meta_end, shift)
+        elif box_type == b"iref":
+            box = _write_iref(meta["iref"])
+        elif box_type == b"iprp":
+            box = _write_iprp(meta["iprp"])
+        elif box_type == b"idat":
+            box = _box(b"idat", bytes(meta["idat"]))
+        children.append(box)
+    return _box(b"meta", meta["header"] + b"".join(children))
+
+
+def _item_extents(meta, data, item_id):
+    """
+    Returns the extents of an item's data as (source, offset, length)
+    where source is "file" or "idat", or None if its data can't be located.
+    """
+    for item in meta["iloc"]["items"]:
+        if item["id"] != item_id:
+            continue
+        if item["data_reference_index"] != 0 or item["construction_method"] not in (0, 1):
+            return None
+        source = "file" if item["construction_method"] == 0 else "idat"
+        source_size = len(data) if source == "file" else len(meta.get("idat", b""))
+        extents = []
+        for _, extent_offset, extent_length in item["extents"]:
+            offset = item["base_offset"] + extent_offset
+            if extent_length == 0:
+                extent_length = source_size - offset  # up to the end
+            if offset + extent_length > source_size:
+                raise ValueError(f"Invalid data location of item {item_id}")
+            extents.append((source, offset, extent_length))
+        return extents
+    return None
+
+
+def _read_item(meta, data, extents):
+    return b"".join(
+        bytes(data[offset : offset + length])
+        if source == "file"
+        else bytes(meta["idat"][offset : offset + length])
+        for source, offset, length in extents
+    )
+
+
+def _patch_item(meta, extents, offset, value, patches):
+    """Overwrites item data at `offset` with `value`, across extents."""
+    for source, extent_offset, extent_length in extents:
+        if offset < extent_length and value:
+            chunk = value[: extent_length - offset]
+            if source == "file":
+                patches.append((extent_offset + offset, chunk))
+            else:
+                start = extent_offset + offset
+                meta["idat"][start : start + len(chunk)] = chunk
+            value = value[len(chunk) :]
+            offset = 0
+        else:
+            offset -= extent_length
+
+
+def _is_metadata(item, kinds):
+    if item["type"] == b"Exif":
+        return "Exif" in kinds
+    if item["type"] == b"mime":
+        return "mime" in kinds or ("XMP" in kinds and item["content_type"] == _xmp_content_type)
+    return False
+
+
+def _drop_metadata(meta, data, kinds, patches):
+    dropped = {
+        item["id"] for item in meta["iinf"]["items"] if _is_metadata(item, kinds)
+    }
+    if not dropped:
+        return
+
+    for item_id in dropped:
+        extents = _item_extents(meta, data, item_id)
+        for extent in extents or []:
+            _patch_item(meta, [extent], 0, bytes(extent[2]), patches)
+
+    iinf = meta["iinf"]
+    iinf["items"] = [item for item in iinf["items"] if item["id"] not in dropped]
+    iloc = meta["iloc"]
+    iloc["items"] = [item for item in iloc["items"] if item["id"] not in dropped]
+    if "iref" in meta:
+        references = []
+        for box_type, from_id, to_ids in meta["iref"]["references"]:
+            to_ids = [to_id for to_id in to_ids if to_id not in dropped]
+            if from_id not in dropped and to_ids:
+                references.append([box_type, from_id, to_ids])
+        meta["iref"]["references"] = references
+    if "iprp" in meta:
+        for ipma in meta["iprp"]["associations"]:
+            ipma["entries"] = [
+                entry for entry in ipma["entries"] if entry[0] not in dropped
+            ]
+
+
+def _orientation_properties(orientation):
+    """
+    Returns (counterclockwise quarter turns, mirror direction or None) which
+    the reader interprets as the EXIF `orientation`, irot being applied first.
+    """
+    for mirror in (
+        None,
+        _constants.heif_transform_mirror_direction_horizontal,
+        _constants.heif_transform_mirror_direction_vertical,
+    ):
+        for turns in range(4):
+            transformations = Transformations(1, 1)
+            transformations.apply_orientation(turn_ccw=turns)
+            if mirror is not None:
+                horizontal = mirror == _constants.heif_transform_mirror_direction_horizontal
+                transformations.apply_orientation(
+                    flip_horizontal=horizontal, flip_vertical=not horizontal
+                )
+            if transformations.orientation_tag == orientation:
+                return turns, mirror
+
+
+def _set_orientation(meta, data, orientation, patches):
+    primary_id = meta["pitm"]
+    if primary_id is None or "iprp" not in meta:
+        raise ValueError("Invalid HEIF file, it has no primary image properties")
+
+    # The primary image, its thumbnails, and their alpha and depth images
+    references = meta["iref"]["references"] if "iref" in meta else []
+    item_ids = {primary_id}
+    while True:
+        linked_ids = {
+            from_id
+            for box_type, from_id, to_ids in references
+            if box_type in (b"thmb", b"auxl") and item_ids.intersection(to_ids)
+        }
+        if linked_ids <= item_ids:
+            break
+        item_ids |= linked_ids
+
+    # The new properties, reusing identical ones already in ipco
+    turns, mirror = _orientation_properties(orientation)
+    new_properties = []
+    if turns:
+        new_properties.append(_box(b"irot", bytes([turns])))
+    if mirror is not None:
+        new_properties.append(_box(b"imir", bytes([mirror])))
+    properties = meta["iprp"]["properties"]
+    indexes = []
+    for box in new_properties:
+        if box not in properties:
+            properties.append(box)
+        indexes.append(properties.index(box) + 1)
+
+    for ipma in meta["iprp"]["associations"]:
+        for entry in ipma["entries"]:
+            item_id, associations = entry
+            if item_id not in item_ids:
+                continue
+            associations = [
+                (essential, index)
+                for essential, index in associations
+                if index == 0 or properties[index - 1][4:8] not in (b"irot", b"imir")
+            ]
+            # Transformative properties are essential and come last
+            entry[1] = associations + [(1, index) for index in indexes]
+
+    # Keep the Exif Orientation tag of the primary image consistent
+    exif_ids = {
+        from_id
+        for box_type, from_id, to_ids in references
+        if box_type == b"cdsc" and primary_id in to_ids
+    }
+    for item in meta["iinf"]["items"]:
+        if item["id"] not in exif_ids or item["type"] != b"Exif":
+            continue
+        extents = _item_extents(meta, data, item["id"])
+        if not extents:
+            continue
+        value = _find_ifd0_value(_read_item(meta, data, extents), _exif_orientation_tag)
+        if value is None:
+            continue
+        offset, field_type, count, endian = value
+        if field_type == 3 and count == 1:  # SHORT
+            _patch_item(meta, extents, offset, struct.pack(endian + "H", orientation), patches)
@@ -11,8 +11,8 @@ setup(
     version=version,
     packages=["pyheif"],
     package_data={"pyheif": ["data/*"]},
-    install_requires=["cffi>=1.0.0"],
-    setup_requires=["cffi>=1.0.0"],
+    install_requires=["cffi>=1.12.0"],
+    setup_requires=["cffi>=1.12.0"],
     cffi_modules=["libheif/libheif_build.py:ffibuilder"],
     author="Anthony Paes",
     author_email="ant32bit-carsales@users.noreply.github.com",
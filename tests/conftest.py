@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from PIL import Image
+
+
+heic_files = list(Path().glob("tests/images/**/*.heic"))
+hif_files = list(Path().glob("tests/images/**/*.HIF"))
+avif_files = list(Path().glob("tests/images/**/*.avif"))
+heif_files = heic_files + hif_files + avif_files
+
+
+def create_pillow_image(heif_file):
+    heif_file = heif_file.load()
+    return Image.frombytes(
+        heif_file.mode,
+        heif_file.size,
+        heif_file.data,
+        "raw",
+        heif_file.mode,
+        heif_file.stride,
+    )
@@ -0,0 +1,84 @@
+import shutil
+
+import pyheif
+import pytest
+from PIL import Image
+from pyheif.__main__ import main
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    input_dir = tmp_path / "input"
+    (input_dir / "nested").mkdir(parents=True)
+    shutil.copy("tests/images/arrow.heic", input_dir)
+    shutil.copy("tests/images/tree-with-transparency.heic", input_dir / "nested")
+    return input_dir
+
+
+@pytest.mark.parametrize("format, suffix", [("jpeg", ".jpg"), ("png", ".png")])
+def test_convert(input_dir, tmp_path, format, suffix, capsys):
+    output_dir = tmp_path / "output"
+    code = main([
+        "convert", str(input_dir), "-r", "-f", format, "-o", str(output_dir), "-j", "2",
+    ])
+    assert code == 0
+
+    converted = output_dir / ("arrow" + suffix)
+    with Image.open(converted) as image:
+        assert image.size == pyheif.open("tests/images/arrow.heic").size
+    assert (output_dir / "nested" / ("tree-with-transparency" + suffix)).exists()
+
+    err = capsys.readouterr().err
+    assert "converted 2 files" in err
+    assert "files/s" in err and "p99" in err
+
+
+def test_convert_not_recursive(input_dir, capsys):
+    assert main(["convert", str(input_dir), "-q"]) == 0
+    assert (input_dir / "arrow.jpg").exists()
+    assert not (input_dir / "nested" / "tree-with-transparency.jpg").exists()
+
+
+def test_convert_raw_max_size(input_dir, tmp_path):
+    output_dir = tmp_path / "output"
+    code = main([
+        "convert", str(input_dir / "arrow.heic"), "-f", "raw", "--max-size", "100",
+        "-o", str(output_dir),
+    ])
+    assert code == 0
+    (level,) = pyheif.read_pyramid("tests/images/arrow.heic", [100])
+    raw = (output_dir / "arrow.raw").read_bytes()
+    assert len(raw) == level.size[0] * level.size[1] * 3
+
+
+def test_convert_thumbnail_processes(input_dir, tmp_path):
+    output_dir = tmp_path / "output"
+    code = main([
+        "convert", str(input_dir / "arrow.heic"), "--thumbnail", "--processes", "-j", "2",
+        "-o", str(output_dir),
+    ])
+    assert code == 0
+    with Image.open(output_dir / "arrow.jpg") as image:
+        assert max(image.size) < max(pyheif.open("tests/images/arrow.heic").size)
+
+
+def test_convert_skip_existing(input_dir, capsys):
+    assert main(["convert", str(input_dir), "-r", "-q"]) == 0
+    capsys.readouterr()
+    assert main(["convert", str(input_dir), "-r", "--skip-existing"]) == 0
+    assert "skipped 2" in capsys.readouterr().err
+
+
+def test_convert_error(tmp_path, capsys):
+    bad = tmp_path / "bad.heic"
+    bad.write_bytes(b"not a heif file at all")
+    assert main(["convert", str(bad)]) == 1
+    assert "1 errors" in capsys.readouterr().err
+
+
+def test_probe(input_dir, capsys):
+    assert main(["probe", str(input_dir), "-r"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("path\twidth")
+    assert len(out) == 3
+    assert out[1].split("\t")[1:3] == ["3024", "4032"]
@@ -0,0 +1,89 @@
+import os
+
+import pyheif
+import pytest
+
+
+def test_init_deinit():
+    pyheif.init()
+    try:
+        heif_file = pyheif.read("tests/images/arrow.heic")
+        assert len(heif_file.data) > 0
+    finally:
+        pyheif.deinit()
+
+
+def test_init_without_preload():
+    pyheif.init(preload_plugins=False)
+    pyheif.deinit()
+
+
+def test_deinit_without_init():
+    assert pyheif.library._init_count == 0
+    pyheif.deinit()
+    assert pyheif.library._init_count == 0
+
+
+def _decode_in_child(reinit):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            if reinit:
+                pyheif.init()
+            heif_file = pyheif.read("tests/images/arrow.heic")
+            if len(heif_file.data) > 0:
+                code = 0
+            if reinit:
+                pyheif.deinit()
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.WEXITSTATUS(status)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+@pytest.mark.parametrize("reinit", [False, True])
+def test_fork_after_init(reinit):
+    pyheif.init()
+    try:
+        assert _decode_in_child(reinit) == 0
+        # Parent is still usable after fork
+        pyheif.read("tests/images/arrow.heic")
+    finally:
+        pyheif.deinit()
+
+
+def test_warm_up_images():
+    for filename in pyheif.library._warm_up_images.values():
+        heif_file = pyheif.read("pyheif/data/" + filename)
+        assert heif_file.size == (16, 16)
+
+
+def test_init_warms_up_decoders(monkeypatch):
+    decoded = []
+    monkeypatch.setattr(pyheif.library, "_read", decoded.append)
+    pyheif.init()
+    pyheif.deinit()
+    assert "warmup.heic" in [os.path.basename(path) for path in decoded]
+
+    decoded.clear()
+    pyheif.init(preload_plugins=False)
+    pyheif.deinit()
+    assert decoded == []
+
+
+def test_init_failure_releases_reference(tmp_path):
+    with pytest.raises(Exception):
+        pyheif.init(plugin_directory=tmp_path / "missing")
+    assert pyheif.library._init_count == 0
+
+
+def test_warm_up_failure_releases_reference(monkeypatch):
+    def fail(path):
+        raise ValueError("corrupt warm-up image")
+
+    monkeypatch.setattr(pyheif.library, "_read", fail)
+    with pytest.raises(ValueError):
+        pyheif.init()
+    assert pyheif.library._init_count == 0
@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pyheif
+import pytest
+
+from .conftest import heif_files
+
+
+
+def test_probe_many_matches_open_container():
+    probes = pyheif.probe_many(heif_files, workers=4)
+    assert len(probes) == len(heif_files)
+
+    for path, probe in zip(heif_files, probes):
+        assert probe.path == path
+        assert probe.error is None
+
+        container = pyheif.open_container(path)
+        primary = container.primary_image
+        assert (probe.width, probe.height) == primary.image.size
+        assert probe.bit_depth == primary.image.bit_depth
+        assert probe.has_alpha == primary.image.has_alpha
+        assert probe.orientation == primary.image.transformations.orientation_tag
+        assert probe.image_count == len(container.top_level_images)
+        assert probe.has_depth == (primary.depth_image is not None)
+        assert probe.has_auxiliary == bool(primary.auxiliary_images)
+        assert probe.has_exif == any(
+            m["type"] == "Exif" for m in primary.image.metadata or []
+        )
+
+
+def test_probe_many_sources():
+    path = Path("tests/images/arrow.heic")
+    by_path, by_name, by_bytes = pyheif.probe_many(
+        [path, str(path), path.read_bytes()]
+    )
+    assert by_path.error is None
+    assert by_name.path == str(path)
+    assert by_bytes.path is None
+    assert (by_path.width, by_path.height) == (by_bytes.width, by_bytes.height)
+
+
+def test_probe_many_errors():
+    probes = pyheif.probe_many([b"not a heif file at all", Path("tests/images/arrow.heic")])
+    assert probes[0].error
+    assert probes[0].width == 0
+    assert probes[1].error is None
+
+
+def test_probe_many_numpy():
+    np = pytest.importorskip("numpy")
+    paths = heif_files + [b"not a heif file at all"]
+    probes = pyheif.probe_many(paths, workers=2)
+    array = pyheif.probe_many(paths, workers=2, as_numpy=True)
+    assert array.dtype == np.dtype(pyheif.PROBE_DTYPE)
+    assert len(array) == len(paths)
+    assert list(array["width"]) == [p.width for p in probes]
+    assert list(array["ok"]) == [p.error is None for p in probes]
+
+
+def test_read_exif_matches_exif_tags():
+    names = list(pyheif.EXIF_TAGS)
+    found = 0
+    for path in heif_files:
+        image = pyheif.open(path)
+        expected = image.exif_tags(*names)
+        assert pyheif.read_exif(path, names) == expected
+        assert pyheif.read_exif(path.read_bytes(), names) == expected
+        found += bool(expected)
+    assert found > 0
+
+
+def test_read_exif_selected_tags():
+    path = Path("tests/images/iPhoneXR.heic")
+    tags = pyheif.read_exif(path, ["Make", "Orientation", ("Exif", 0x9003)])
+    assert tags["Make"] == "Apple"
+    assert tags["Orientation"] == 1
+    assert isinstance(tags[("Exif", 0x9003)], str)
+    assert pyheif.read_exif(path, []) == {}
+
+
+def test_files_are_unmapped(monkeypatch, tmp_path):
+    mapped = []
+    map_file = pyheif.probe._map_file
+
+    def recording_map_file(path):
+        mapped.append(map_file(path))
+        return mapped[-1]
+
+    monkeypatch.setattr(pyheif.probe, "_map_file", recording_map_file)
+    invalid = tmp_path / "invalid.heic"
+    invalid.write_bytes(b"\0" * 4096)
+    pyheif.probe_many(heif_files[:3] + [invalid])
+    pyheif.read_exif("tests/images/iPhoneXR.heic", ["Make"])
+    assert len(mapped) == 5
+    assert all(m.closed for m in mapped)
@@ -1,6 +1,9 @@
 import gc
 import glob
 import io
+import pickle
+import sys
+import threading
 from pathlib import Path
 
 import piexif
@@ -8,23 +11,7 @@ from PIL import Image, ImageCms
 import pyheif.reader
 import pytest
 
-
-heic_files = list(Path().glob("tests/images/**/*.heic"))
-hif_files = list(Path().glob("tests/images/**/*.HIF"))
-avif_files = list(Path().glob("tests/images/**/*.avif"))
-heif_files = heic_files + hif_files + avif_files
-
-
-def create_pillow_image(heif_file):
-    heif_file = heif_file.load()
-    return Image.frombytes(
-        heif_file.mode,
-        heif_file.size,
-        heif_file.data,
-        "raw",
-        heif_file.mode,
-        heif_file.stride,
-    )
+from .conftest import create_pillow_image, heif_files
 
 
 @pytest.mark.parametrize("path", heif_files)
@@ -89,6 +76,32 @@ def test_read_exif_metadata(heif_file):
             assert len(exif_dict["Exif"]) > 0
 
 
+def test_exif_tags_match_piexif(heif_file):
+    for m in heif_file.metadata or []:
+        if m["type"] == "Exif":
+            exif_dict = piexif.load(m["data"])
+            tags = heif_file.exif_tags(*pyheif.EXIF_TAGS)
+            for name, (ifd, tag) in pyheif.EXIF_TAGS.items():
+                expected = exif_dict[ifd].get(tag)
+                if isinstance(expected, bytes):
+                    expected = expected.split(b"\x00", 1)[0].decode()
+                assert tags.get(name) == expected, name
+            assert heif_file.exif_tags(("0th", 0x0112)) == {
+                ("0th", 0x0112): exif_dict["0th"][0x0112]
+            }
+            break
+    else:
+        assert heif_file.exif_tags("Orientation") == {}
+
+
+def test_exif_tags_unknown_name():
+    heif_file = pyheif.open("tests/images/arrow.heic")
+    with pytest.raises(KeyError):
+        heif_file.exif_tags("NotATag")
+    with pytest.raises(ValueError):
+        heif_file.exif_tags(("Interop", 1))
+
+
 def test_read_icc_color_profile(heif_file):
     if heif_file.color_profile and heif_file.color_profile["type"] in ["prof", "rICC"]:
         profile = io.BytesIO(heif_file.color_profile["data"])
@@ -110,7 +123,7 @@ def apply_transformations(im, transformations):
         7: Image.Transpose.TRANSVERSE,
         8: Image.Transpose.ROTATE_90,
     }.get(transformations.orientation_tag)
-    if method:
+    if method is not None:
         im = im.transpose(method)
     return im
 
@@ -144,6 +157,78 @@ def test_read_transformations(path):
     assert native == transformed
 
 
+@pytest.mark.parametrize("path", [
+    "tests/images/parfait.heic",  # orientation
+    "tests/images/tree-with-transforms.avif",  # orientation + crop
+    "tests/images/tree-with-transparency.heic",  # to transformations
+])
+def test_oriented_view(path):
+    np = pytest.importorskip("numpy")
+    heif_native = pyheif.read(path, apply_transformations=False)
+    view = heif_native.oriented_view()
+    array = np.asarray(view)
+    assert array.base is not None  # no copy
+
+    transformed = create_pillow_image(pyheif.read(path))
+    assert view.size == transformed.size
+    assert np.array_equal(array, np.asarray(transformed))
+
+    # Transformed images are viewed as is
+    view = pyheif.open(path).oriented_view()
+    assert np.array_equal(np.asarray(view), np.asarray(transformed))
+
+
+@pytest.mark.parametrize("orientation_tag", range(1, 9))
+def test_oriented_view_orientations(orientation_tag):
+    np = pytest.importorskip("numpy")
+    heif_native = pyheif.read("tests/images/lego.heic", apply_transformations=False)
+    heif_native.transformations.crop = (10, 20, 110, 70)
+    heif_native.transformations.orientation_tag = orientation_tag
+
+    expected = apply_transformations(
+        create_pillow_image(heif_native), heif_native.transformations
+    )
+    view = heif_native.oriented_view()
+    assert view.size == expected.size
+    assert np.array_equal(np.asarray(view), np.asarray(expected))
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/parfait.heic",  # orientation
+    "tests/images/tree-with-transforms.avif",  # orientation + crop
+])
+@pytest.mark.parametrize("apply", [True, False])
+def test_oriented_view_of_pyramid_level(path, apply):
+    np = pytest.importorskip("numpy")
+    transformed = create_pillow_image(pyheif.read(path))
+    # Sizes apply to the decoded image, which isn't cropped without transformations
+    max_size = max(pyheif.open(path, apply_transformations=apply).size) // 3
+    (level,) = pyheif.read_pyramid(path, [max_size], apply_transformations=apply)
+    view = level.oriented_view()
+    array = np.asarray(view)
+    assert array.shape[:2] == view.size[::-1]
+    scale = max(level.size) / max(pyheif.open(path, apply_transformations=apply).size)
+    for side, full_side in zip(view.size, transformed.size):
+        assert abs(side - full_side * scale) <= 1
+
+    expected = np.asarray(transformed.resize(view.size, Image.BOX)).astype(int)
+    assert np.abs(array.astype(int) - expected).mean() < 8
+
+
+def test_oriented_view_checks_bounds():
+    heif_native = pyheif.read("tests/images/lego.heic", apply_transformations=False)
+    width, height = heif_native.size
+    for crop in [(0, 0, width + 1, height), (10, 10, 10, 20), (0, -1, 10, 10)]:
+        heif_native.transformations.crop = crop
+        with pytest.raises(ValueError):
+            heif_native.oriented_view()
+
+    heif_native.transformations.crop = (0, 0, width, height)
+    heif_native.data = heif_native.data[: len(heif_native.data) - 1]
+    with pytest.raises(ValueError):
+        heif_native.oriented_view()
+
+
 @pytest.mark.parametrize("path", heif_files)
 def test_open_and_load(path):
     heif_file = pyheif.open(path)
@@ -229,3 +314,533 @@ def test_no_transformations():
     native = create_pillow_image(native)
 
     assert transformed == native.transpose(Image.ROTATE_270)
+
+
+def _numpy_image(heif_file, channels, dtype="u1"):
+    np = pytest.importorskip("numpy")
+    width, height = heif_file.size
+    array = np.frombuffer(heif_file.data, dtype=dtype)
+    row_items = heif_file.stride // array.itemsize
+    array = array.reshape(height, row_items)[:, : width * channels]
+    return array.reshape(height, width, channels)
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/lego.heic",  # no alpha
+    "tests/images/tree-with-transparency.heic",  # alpha
+    "tests/images/nokia/alpha/alpha_1440x960.heic",
+])
+@pytest.mark.parametrize("output_format", pyheif.OUTPUT_FORMATS)
+def test_output_format(path, output_format):
+    np = pytest.importorskip("numpy")
+    channels = len(output_format)
+    reference = pyheif.read(path, output_format="RGBA" if channels == 4 else "RGB")
+    reference = _numpy_image(reference, channels).astype(np.uint32)
+
+    heif_file = pyheif.read(path, output_format=output_format)
+    assert heif_file.mode == output_format
+    assert heif_file.stride == heif_file.size[0] * channels
+    assert len(heif_file.data) == heif_file.stride * heif_file.size[1]
+    result = _numpy_image(heif_file, channels)
+
+    expected = reference.copy()
+    if output_format.endswith("a"):
+        alpha = reference[..., 3:]
+        expected[..., :3] = (2 * reference[..., :3] * alpha + 255) // 510
+    if output_format.startswith("B"):
+        expected[..., [0, 2]] = expected[..., [2, 0]]
+    assert np.array_equal(result, expected)
+
+
+def test_output_format_no_alpha_source():
+    np = pytest.importorskip("numpy")
+    heif_file = pyheif.read("tests/images/lego.heic", output_format="RGBA")
+    assert not heif_file.has_alpha
+    assert (_numpy_image(heif_file, 4)[..., 3] == 255).all()
+
+
+def test_output_format_hdr():
+    np = pytest.importorskip("numpy")
+    path = "tests/images/avif-sample-images/fox.profile0.10bpc.yuv420.avif"
+    reference = pyheif.read(path, convert_hdr_to_8bit=False)
+    reference = _numpy_image(reference, 3, reference.dtype)
+    heif_file = pyheif.read(path, convert_hdr_to_8bit=False, output_format="BGR")
+    assert heif_file.stride == heif_file.size[0] * 3 * 2
+    assert np.array_equal(_numpy_image(heif_file, 3, heif_file.dtype), reference[..., ::-1])
+
+    heif_file = pyheif.read(
+        path, convert_hdr_to_8bit=False, output_format="BGR", hdr_byte_order="big"
+    )
+    assert np.array_equal(_numpy_image(heif_file, 3, ">u2"), reference[..., ::-1])
+
+
+def test_output_format_on_load():
+    heif_file = pyheif.open("tests/images/lego.heic")
+    assert heif_file.mode == "RGB"
+    heif_file.load(output_format="BGRA")
+    assert heif_file.mode == "BGRA"
+    assert heif_file.stride == heif_file.size[0] * 4
+
+    heif_file = pyheif.open("tests/images/lego.heic", output_format="BGR")
+    assert heif_file.mode == "BGR"
+
+
+def test_load_with_other_options_after_decoding():
+    heif_file = pyheif.read("tests/images/lego.heic", decode_quality="fast")
+    assert heif_file.load(output_format="RGB", decode_quality="fast") is heif_file
+    with pytest.raises(ValueError):
+        heif_file.load(output_format="BGR")
+    with pytest.raises(ValueError):
+        heif_file.load(decode_quality="best")
+    with pytest.raises(ValueError):
+        heif_file.load(chroma_upsampling="bilinear")
+    assert heif_file.mode == "RGB"
+
+    heif_file = pyheif.open("tests/images/lego.heic")
+    heif_file.load(output_format="BGRA")
+    assert heif_file.load(output_format="BGRA").mode == "BGRA"
+    with pytest.raises(ValueError):
+        heif_file.load(output_format="RGBA")
+
+
+def test_output_format_pillow_premultiplied():
+    heif_file = pyheif.read("tests/images/tree-with-transparency.heic", output_format="RGBa")
+    image = create_pillow_image(heif_file)
+    assert image.mode == "RGBa"
+
+
+def test_premultiplied_alpha_source():
+    np = pytest.importorskip("numpy")
+    path = "tests/images/premultiplied.heic"
+    stored = _numpy_image(pyheif.read(path, output_format="RGBa"), 4).astype(int)
+    assert (stored[16:48, :, 1] < 255).all()  # green is 255 - 4 * x before premultiplying
+
+    for output_format in (None, "RGBA", "BGRA"):
+        heif_file = pyheif.read(path, output_format=output_format)
+        straight = _numpy_image(heif_file, 4).astype(int)
+        if output_format == "BGRA":
+            straight = straight[..., [2, 1, 0, 3]]
+        alpha = straight[..., 3]
+        assert (alpha == stored[..., 3]).all()
+        assert (straight[alpha == 0, :3] == 0).all()
+        # Colors are divided by alpha, premultiplying them again gives the stored ones
+        # (lossy coding can store colors above alpha, those are clipped)
+        repremultiplied = (straight[..., :3] * alpha[..., None] + 127) // 255
+        valid = stored[..., :3] <= alpha[..., None]
+        assert np.abs(repremultiplied - stored[..., :3])[valid].max() <= 1
+        visible = alpha > 32
+        assert (straight[visible, 2] > stored[visible, 2]).any()
+
+    bgra = _numpy_image(pyheif.read(path, output_format="BGRa"), 4)
+    assert (bgra[..., [2, 1, 0, 3]] == stored).all()
+
+
+def test_output_format_invalid():
+    with pytest.raises(ValueError):
+        pyheif.read("tests/images/lego.heic", output_format="YUV")
+
+
+def test_load_pyramid():
+    sizes = [512, 2048, 64, 8000]
+    heif_file = pyheif.open("tests/images/arrow.heic")
+    levels = heif_file.load_pyramid(sizes)
+
+    # The image itself is not loaded
+    assert heif_file.data is None
+
+    assert [max(level.size) for level in levels] == [512, 2048, 64, max(heif_file.size)]
+    width, height = heif_file.size
+    for level in levels:
+        assert abs(level.size[0] / level.size[1] - width / height) < 0.05
+        assert level.mode == heif_file.mode
+        assert level.metadata == heif_file.metadata
+        assert len(level.data) >= level.stride * level.size[1]
+        create_pillow_image(level)
+
+
+def test_read_pyramid_matches_resize():
+    np = pytest.importorskip("numpy")
+    path = "tests/images/lego.heic"
+    full = create_pillow_image(pyheif.read(path))
+    (level,) = pyheif.read_pyramid(path, [max(full.size) // 4])
+
+    expected = full.resize(level.size, Image.BOX)
+    difference = np.abs(
+        np.asarray(create_pillow_image(level), dtype=int) - np.asarray(expected, dtype=int)
+    )
+    assert difference.max() <= 2
+
+
+def test_read_pyramid_hdr():
+    np = pytest.importorskip("numpy")
+    path = "tests/images/avif-sample-images/fox.profile0.10bpc.yuv420.avif"
+    (level,) = pyheif.read_pyramid(path, [100], convert_hdr_to_8bit=False)
+    assert max(level.size) == 100
+    assert level.stride == level.size[0] * 3 * 2
+
+    (big,) = pyheif.read_pyramid(
+        path, [100], convert_hdr_to_8bit=False, hdr_byte_order="big"
+    )
+    assert big.dtype == ">u2"
+    assert np.array_equal(
+        _numpy_image(level, 3, level.dtype), _numpy_image(big, 3, big.dtype)
+    )
+
+
+def test_read_pyramid_thumbnails():
+    path = "tests/images/nokia/still/autumn_1440x960.heic"
+    heif_file = pyheif.open(path)
+    thumbnails = heif_file.thumbnails()
+    if not thumbnails:
+        pytest.skip("no thumbnails")
+    thumbnail_size = max(thumbnails[0].size)
+    levels = pyheif.read_pyramid(path, [thumbnail_size, thumbnail_size // 2])
+    assert [max(level.size) for level in levels] == [thumbnail_size, thumbnail_size // 2]
+    create_pillow_image(levels[1])
+
+
+@pytest.mark.parametrize("sizes", [[0, 1], [64, -1]])
+def test_read_pyramid_invalid_sizes(monkeypatch, sizes):
+    def fail(*args):
+        raise AssertionError("decoded")
+
+    monkeypatch.setattr(pyheif.reader, "_read_heif_image", fail)
+    with pytest.raises(ValueError):
+        pyheif.read_pyramid("tests/images/lego.heic", sizes)
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/nokia/burst/bird_burst.heic",
+    "tests/images/nokia/collection/random_collection_1440x960.heic",
+    "tests/images/nokia/stereo/stereo_1200x800.heic",
+    "tests/images/live-image.heic",
+])
+def test_load_all(path):
+    sequential = pyheif.open_container(path)
+    for top_level_image in sequential.top_level_images:
+        top_level_image.image.load()
+        for aux in top_level_image.auxiliary_images:
+            aux.image.load()
+
+    container = pyheif.open_container(path)
+    assert container.load_all(workers=4, auxiliary_images=True) is container
+    assert len(container.top_level_images) == len(sequential.top_level_images)
+    for parallel, expected in zip(container.top_level_images, sequential.top_level_images):
+        assert type(parallel.image) is pyheif.HeifImage
+        # Row padding isn't initialized by libheif, compare pixels only
+        assert (
+            create_pillow_image(parallel.image).tobytes()
+            == create_pillow_image(expected.image).tobytes()
+        )
+        for aux, expected_aux in zip(parallel.auxiliary_images, expected.auxiliary_images):
+            assert (
+                create_pillow_image(aux.image).tobytes()
+                == create_pillow_image(expected_aux.image).tobytes()
+            )
+
+
+def test_load_concurrently_decodes_once(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+    read_heif_image = pyheif.reader._read_heif_image
+
+    def counting_read_heif_image(handle, heif_file, context_lock):
+        calls.append(heif_file)
+        return read_heif_image(handle, heif_file, context_lock)
+
+    monkeypatch.setattr(pyheif.reader, "_read_heif_image", counting_read_heif_image)
+    heif_file = pyheif.open("tests/images/lego.heic")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: heif_file.load(), range(8)))
+    assert all(result is heif_file for result in results)
+    assert len(calls) == 1
+
+
+def count_concurrent_decodes(monkeypatch, barrier=None):
+    """
+    Wraps heif_decode_image, returns a list with the number of decodes
+    in flight, this one included, at the start of every decode. The first
+    decodes wait on the barrier, if any, so they must run at the same time.
+    """
+    in_flight = []
+    running = [0]
+    lock = threading.Lock()
+    libheif = pyheif.reader.libheif
+
+    class CountingLibheif:
+        def __getattr__(self, name):
+            return getattr(libheif, name)
+
+        def heif_decode_image(self, *args):
+            with lock:
+                running[0] += 1
+                in_flight.append(running[0])
+                waits = barrier is not None and len(in_flight) <= barrier.parties
+            try:
+                if waits:
+                    barrier.wait()
+                return libheif.heif_decode_image(*args)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+    monkeypatch.setattr(pyheif.reader, "libheif", CountingLibheif())
+    return in_flight
+
+
+def test_load_from_threads_locks_the_context(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    in_flight = count_concurrent_decodes(monkeypatch)
+    container = pyheif.open_container("tests/images/nokia/burst/bird_burst.heic")
+    images = [top_level_image.image for top_level_image in container.top_level_images]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda image: image.load(), images))
+    assert in_flight == [1] * len(images)
+
+
+def test_load_all_decodes_in_parallel(monkeypatch):
+    # Serialized decodes would break the barrier on timeout
+    barrier = threading.Barrier(2, timeout=60)
+    in_flight = count_concurrent_decodes(monkeypatch, barrier)
+    container = pyheif.open_container("tests/images/nokia/burst/bird_burst.heic")
+    container.load_all(workers=4)
+    assert len(in_flight) == len(container.top_level_images)
+    assert not barrier.broken
+
+
+def test_thumbnails_lock_the_context(monkeypatch):
+    heif_file = pyheif.open("tests/images/lego.heic")
+    libheif = pyheif.reader.libheif
+    locked = []
+
+    class CheckingLibheif:
+        def __getattr__(self, name):
+            return getattr(libheif, name)
+
+        def heif_image_handle_get_number_of_thumbnails(self, handle):
+            locked.append(heif_file._context_lock.locked())
+            return libheif.heif_image_handle_get_number_of_thumbnails(handle)
+
+    monkeypatch.setattr(pyheif.reader, "libheif", CheckingLibheif())
+    heif_file.thumbnails()
+    assert locked == [True]
+
+
+@pytest.mark.parametrize("decode_quality", ["fast", "balanced", "best"])
+def test_decode_quality(decode_quality):
+    heif_file = pyheif.read("tests/images/lego.heic", decode_quality=decode_quality)
+    assert heif_file.decode_quality == decode_quality
+    create_pillow_image(heif_file)
+
+
+def test_decode_quality_changes_upsampling():
+    path = "tests/images/avif-sample-images/fox.profile0.8bpc.yuv420.avif"
+    fast = pyheif.read(path, decode_quality="fast")
+    best = pyheif.read(path, decode_quality="best")
+    assert fast.size == best.size
+    assert create_pillow_image(fast).tobytes() != create_pillow_image(best).tobytes()
+
+    explicit = pyheif.read(
+        path, chroma_upsampling="nearest_neighbor", only_use_preferred_chroma_algorithm=True
+    )
+    assert create_pillow_image(explicit).tobytes() == create_pillow_image(fast).tobytes()
+
+    # Explicit fields override the preset
+    overridden = pyheif.open(path, decode_quality="best").load(
+        chroma_upsampling="nearest_neighbor"
+    )
+    assert create_pillow_image(overridden).tobytes() == create_pillow_image(fast).tobytes()
+
+
+def test_set_decode_defaults():
+    path = "tests/images/avif-sample-images/fox.profile0.8bpc.yuv420.avif"
+    fast = create_pillow_image(pyheif.read(path, decode_quality="fast")).tobytes()
+    best = create_pillow_image(pyheif.read(path, decode_quality="best")).tobytes()
+
+    pyheif.set_decode_defaults(decode_quality="fast")
+    try:
+        assert create_pillow_image(pyheif.read(path)).tobytes() == fast
+        # Image options override the defaults
+        assert create_pillow_image(pyheif.read(path, decode_quality="best")).tobytes() == best
+    finally:
+        pyheif.set_decode_defaults()
+
+
+def test_decode_quality_invalid():
+    with pytest.raises(ValueError):
+        pyheif.open("tests/images/lego.heic", decode_quality="ultra")
+    with pytest.raises(ValueError):
+        pyheif.open("tests/images/lego.heic", chroma_upsampling="bicubic")
+    with pytest.raises(ValueError):
+        pyheif.set_decode_defaults(decode_quality="ultra")
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="pickle protocol 5 needs Python 3.8")
+def test_pickle_out_of_band():
+    heif_file = pyheif.read("tests/images/lego.heic", output_format="BGR")
+    buffers = []
+    dumped = pickle.dumps(heif_file, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    assert len(dumped) < 10000
+
+    restored = pickle.loads(dumped, buffers=buffers)
+    assert type(restored) is pyheif.HeifImage
+    assert bytes(restored.data) == bytes(heif_file.data)
+    assert restored.size == heif_file.size
+    assert restored.mode == "BGR"
+    assert restored.stride == heif_file.stride
+    assert restored.metadata == heif_file.metadata
+    assert restored.color_profile == heif_file.color_profile
+    assert restored.transformations.orientation_tag == heif_file.transformations.orientation_tag
+    # The unpickled data wraps the out-of-band buffer without copying it
+    ffi = pyheif.reader.ffi
+    assert ffi.cast("uintptr_t", ffi.from_buffer(restored.data)) == ffi.cast(
+        "uintptr_t", ffi.from_buffer(heif_file.data)
+    )
+
+
+@pytest.mark.parametrize("protocol", [2, 3, 4, pickle.HIGHEST_PROTOCOL])
+def test_pickle_in_band(protocol):
+    heif_file = pyheif.read("tests/images/arrow.heic")
+    if protocol < 5:
+        # Older protocols get a copy of the pixels as bytes
+        _, (data,), _ = heif_file.__reduce_ex__(protocol)
+        assert type(data) is bytes
+    restored = pickle.loads(pickle.dumps(heif_file, protocol=protocol))
+    assert bytes(restored.data) == bytes(heif_file.data)
+    assert restored.mode == heif_file.mode
+    assert create_pillow_image(restored).tobytes() == create_pillow_image(heif_file).tobytes()
+
+
+def test_pickle_undecoded_image_as_reference(tmp_path):
+    path = Path("tests/images/lego.heic")
+    heif_file = pyheif.open(path, apply_transformations=False, output_format="RGBA")
+    dumped = pickle.dumps(heif_file)
+    assert len(dumped) < 1000
+
+    restored = pickle.loads(dumped)
+    assert type(restored) is pyheif.UndecodedHeifImage
+    assert restored.apply_transformations is False
+    assert restored.mode == "RGBA"
+    expected = create_pillow_image(heif_file.load()).tobytes()
+    assert create_pillow_image(restored.load()).tobytes() == expected
+
+    # Images opened from bytes carry the file content
+    heif_file = pyheif.open(path.read_bytes())
+    restored = pickle.loads(pickle.dumps(heif_file))
+    assert type(restored) is pyheif.UndecodedHeifImage
+    assert create_pillow_image(restored.load()).size == heif_file.size
+
+
+def test_pickle_container():
+    path = "tests/images/nokia/stereo/stereo_1200x800.heic"
+    container = pyheif.open_container(path)
+    restored = pickle.loads(pickle.dumps(container))
+    assert len(restored.top_level_images) == len(container.top_level_images)
+    for top_level_image, expected in zip(restored.top_level_images, container.top_level_images):
+        assert top_level_image.id == expected.id
+        assert top_level_image.is_primary == expected.is_primary
+        assert type(top_level_image.image) is pyheif.UndecodedHeifImage
+        assert (
+            create_pillow_image(top_level_image.image.load()).tobytes()
+            == create_pillow_image(expected.image.load()).tobytes()
+        )
+
+    # Now loaded, the pixels are pickled
+    restored = pickle.loads(pickle.dumps(container, protocol=pickle.HIGHEST_PROTOCOL))
+    for top_level_image in restored.top_level_images:
+        assert type(top_level_image.image) is pyheif.HeifImage
+        assert not hasattr(top_level_image.image, "_load_lock")
+
+
+def test_pickle_depth_and_auxiliary_images():
+    path = "tests/images/live-image.heic"
+    for top_level_image in pyheif.open_container(path).top_level_images:
+        images = [aux.image for aux in top_level_image.auxiliary_images]
+        if top_level_image.depth_image is not None:
+            images.append(top_level_image.depth_image.image)
+        for image in images:
+            restored = pickle.loads(pickle.dumps(image))
+            assert restored.size == image.size
+            assert (
+                create_pillow_image(restored.load()).tobytes()
+                == create_pillow_image(image.load()).tobytes()
+            )
+
+
+def test_pickle_thumbnail():
+    heif_file = pyheif.open("tests/images/nokia/still/autumn_1440x960.heic")
+    thumbnails = heif_file.thumbnails()
+    if not thumbnails:
+        pytest.skip("no thumbnails")
+    restored = pickle.loads(pickle.dumps(thumbnails[0]))
+    assert restored.size == thumbnails[0].size
+    assert (
+        create_pillow_image(restored.load()).tobytes()
+        == create_pillow_image(thumbnails[0].load()).tobytes()
+    )
+
+
+def test_loaded_images_free_file_data():
+    class Reader:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self, length=-1):
+            return self.data
+
+    # bytes can't be weakly referenced, count references instead
+    data = Path("tests/images/lego.heic").read_bytes()
+    refcount = sys.getrefcount(data)
+    container = pyheif.open_container(Reader(data))
+    assert sys.getrefcount(data) > refcount
+
+    heif_file = container.primary_image.image
+    thumbnail = heif_file.thumbnails()[0]
+    heif_file.load()
+    thumbnail.load()
+    del container
+    gc.collect()
+    assert sys.getrefcount(data) == refcount
+    assert len(heif_file.data) > 0 and len(thumbnail.data) > 0
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/avif-sample-images/fox.profile0.10bpc.yuv420.avif",
+    "tests/images/avif-sample-images/fox.profile2.12bpc.yuv444.avif",
+])
+def test_hdr_byte_order(path):
+    np = pytest.importorskip("numpy")
+    native = pyheif.read(path, convert_hdr_to_8bit=False)
+    assert native.dtype == ("<u2" if sys.byteorder == "little" else ">u2")
+    little = pyheif.read(path, convert_hdr_to_8bit=False, hdr_byte_order="little")
+    big = pyheif.read(path, convert_hdr_to_8bit=False, hdr_byte_order="big")
+    assert (little.dtype, big.dtype) == ("<u2", ">u2")
+
+    array = _numpy_image(native, 3, native.dtype)
+    assert np.array_equal(_numpy_image(little, 3, "<u2"), array)
+    assert np.array_equal(_numpy_image(big, 3, ">u2"), array)
+    # Values keep their bit depth in 16-bit containers, they aren't scaled
+    assert array.max() < 1 << native.bit_depth
+    assert array.max() >= 1 << (native.bit_depth - 1)
+
+    # The native byte order array can be used without conversion
+    view = np.asarray(native.oriented_view())
+    assert view.dtype.isnative
+    assert np.array_equal(view, array)
+
+
+def test_hdr_byte_order_8bit():
+    heif_file = pyheif.read("tests/images/lego.heic", hdr_byte_order="big")
+    assert heif_file.dtype == "|u1"
+    heif_file = pyheif.read(
+        "tests/images/lego.heic", convert_hdr_to_8bit=False, hdr_byte_order="little"
+    )
+    assert heif_file.dtype == "|u1"
+
+
+def test_hdr_byte_order_invalid():
+    with pytest.raises(ValueError):
+        pyheif.open("tests/images/lego.heic", hdr_byte_order="middle")
@@ -0,0 +1,115 @@
+import io
+from pathlib import Path
+
+from PIL import Image
+import pyheif
+import pytest
+
+from .conftest import create_pillow_image, heif_files
+
+
+# PIL operations which display an image stored with the given EXIF orientation
+orientation_transpose = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def rewrite_to_bytes(fp, **kwargs):
+    out = io.BytesIO()
+    pyheif.rewrite(fp, out, **kwargs)
+    return out.getvalue()
+
+
+def metadata_types(heif_file):
+    return [m["type"] for m in heif_file.metadata or []]
+
+
+@pytest.mark.parametrize("path", heif_files)
+def test_rewrite_unchanged(path):
+    assert rewrite_to_bytes(path) == path.read_bytes()
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/iPhoneXR.heic",
+    "tests/images/live-image.heic",
+    "tests/images/multiimage.heic",
+])
+def test_drop_metadata(path, tmp_path):
+    original = Path(path).read_bytes()
+    out = tmp_path / "stripped.heic"
+    pyheif.rewrite(path, out, drop_metadata=["Exif", "XMP"])
+    stripped = out.read_bytes()
+    assert len(stripped) == len(original)
+
+    heif_file = pyheif.read(stripped)
+    assert "Exif" not in metadata_types(heif_file)
+    assert not pyheif.probe_many([out])[0].has_exif
+    assert pyheif.read_exif(out, ["Make"]) == {}
+    for m in pyheif.read(path).metadata or []:
+        # Removed metadata doesn't remain in the file data either
+        if m["type"] == "Exif" or m["data"].startswith(b"<?xpacket"):
+            assert bytes(m["data"][-64:]) not in stripped
+
+    expected = pyheif.read(path)
+    assert create_pillow_image(heif_file).tobytes() == create_pillow_image(expected).tobytes()
+
+
+def test_drop_only_exif():
+    path = "tests/images/live-image.heic"
+    heif_file = pyheif.open(rewrite_to_bytes(path, drop_metadata=["Exif"]))
+    assert metadata_types(heif_file) == ["mime"]
+
+    heif_file = pyheif.open(rewrite_to_bytes(path, drop_metadata=["mime"]))
+    assert metadata_types(heif_file) == ["Exif"]
+
+
+@pytest.mark.parametrize("path", [
+    "tests/images/arrow.heic",
+    "tests/images/nokia/grid/grid_960x640.heic",
+    "tests/images/tree-with-transforms.avif",
+])
+@pytest.mark.parametrize("orientation", range(1, 9))
+def test_set_orientation(path, orientation):
+    rewritten = rewrite_to_bytes(path, set_orientation=orientation)
+    transformations = pyheif.open(rewritten, apply_transformations=False).transformations
+    assert transformations.orientation_tag in ((0, 1) if orientation == 1 else (orientation,))
+
+    # The stored image is the same, only displayed differently. Crop comes
+    # before rotation and mirroring, so orientation 1 is the cropped image.
+    image = create_pillow_image(pyheif.read(rewrite_to_bytes(path, set_orientation=1)))
+    if orientation in orientation_transpose:
+        image = image.transpose(orientation_transpose[orientation])
+    assert create_pillow_image(pyheif.read(rewritten)).tobytes() == image.tobytes()
+
+    if pyheif.read_exif(path, ["Orientation"]):
+        assert pyheif.read_exif(rewritten, ["Orientation"]) == {"Orientation": orientation}
+
+
+def test_rewrite_file_objects():
+    path = Path("tests/images/parfait.heic")
+    out = io.BytesIO()
+    with open(path, "rb") as f:
+        pyheif.rewrite(f, out, drop_metadata=["Exif"], set_orientation=1)
+    heif_file = pyheif.read(out.getvalue())
+    assert heif_file.size == (3024, 4032)[::-1]
+    assert metadata_types(heif_file) == []
+
+
+def test_rewrite_invalid_arguments(tmp_path):
+    path = "tests/images/arrow.heic"
+    with pytest.raises(ValueError):
+        pyheif.rewrite(path, io.BytesIO(), drop_metadata=["GPS"])
+    with pytest.raises(ValueError):
+        pyheif.rewrite(path, io.BytesIO(), set_orientation=9)
+    with pytest.raises(ValueError):
+        pyheif.rewrite(b"not a heif file at all", io.BytesIO())
+    copy = tmp_path / "arrow.heic"
+    copy.write_bytes(Path(path).read_bytes())
+    with pytest.raises(ValueError):
+        pyheif.rewrite(copy, copy, drop_metadata=["Exif"])
@@ -0,0 +1,187 @@
+"""
+Soak tests: run the reader repeatedly over the whole tests/images corpus
+and check that native objects are freed and RSS stays bounded.
+
+test_soak is slow and only runs when the PYHEIF_SOAK_ITERATIONS environment
+variable sets the number of iterations, e.g. PYHEIF_SOAK_ITERATIONS=200 for
+a long run.
+"""
+import ctypes
+import gc
+import os
+import pickle
+import subprocess
+import sys
+
+import pyheif
+import pytest
+
+from .conftest import heif_files
+
+
+ITERATIONS = int(os.environ.get("PYHEIF_SOAK_ITERATIONS", "2"))
+
+# Allowed RSS growth after the warm-up iteration
+RSS_LIMIT = int(os.environ.get("PYHEIF_SOAK_RSS_LIMIT_MB", "32")) * 1024 * 1024
+
+
+def load_glibc():
+    try:
+        libc = ctypes.CDLL("libc.so.6")
+        libc.malloc_trim
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+libc = load_glibc()
+
+
+@pytest.fixture
+def track_native_objects(monkeypatch):
+    # Tracks objects created during the test only, the previous state is restored after it
+    monkeypatch.setattr(pyheif.reader, "_native_objects", None)
+    pyheif.reader._track_native_objects()
+
+
+def get_rss():
+    gc.collect()
+    if libc is not None:
+        libc.malloc_trim(0)
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def outstanding_native_objects(since=None):
+    """
+    Returns {type: count} of native objects created and not freed
+    since the `since` result, only for non-zero counts.
+    """
+    gc.collect()
+    since = since or {}
+    counts = pyheif.reader._outstanding_native_objects()
+    counts = {kind: count - since.get(kind, 0) for kind, count in counts.items()}
+    return {kind: count for kind, count in counts.items() if count}
+
+
+def exercise(path, iteration):
+    """
+    Opens path in several ways, decodes some images and leaves others
+    undecoded, then drops everything.
+    """
+    container = pyheif.open_container(path)
+    for index, top_level_image in enumerate(container.top_level_images):
+        # Alternate which images are loaded between iterations
+        if (index + iteration) % 2 == 0:
+            top_level_image.image.load()
+        if top_level_image.depth_image is not None and iteration % 2:
+            top_level_image.depth_image.image.load()
+        for aux in top_level_image.auxiliary_images[iteration % 2 :: 2]:
+            aux.image.load()
+
+    primary = container.primary_image.image
+    primary.exif_tags("Orientation", "DateTimeOriginal")
+    thumbnails = primary.thumbnails()
+    if thumbnails and iteration % 2:
+        thumbnails[0].load()
+    pickle.loads(pickle.dumps(primary))
+
+    # Keep only a view of one image, partially consumed
+    view = primary.oriented_view()
+    bytes(memoryview(view.image.data)[: view.image.stride])
+    del container, primary, thumbnails, top_level_image
+
+    if iteration % 2:
+        pyheif.read_pyramid(path, [64])
+    else:
+        pyheif.read(path.read_bytes(), output_format="BGRA")
+    pyheif.read_exif(path, ["Make", "Model"])
+    return view
+
+
+def run_corpus(iteration):
+    views = [exercise(path, iteration) for path in heif_files]
+    pyheif.probe_many(heif_files, workers=2)
+    pyheif.open_container(heif_files[0]).load_all(workers=2)
+    with pytest.raises(Exception):
+        pyheif.read(heif_files[0].read_bytes()[:1000])
+    del views
+
+
+def test_native_objects_are_tracked(track_native_objects):
+    before = outstanding_native_objects()
+
+    container = pyheif.open_container("tests/images/live-image.heic")
+    image = container.primary_image.image.load()
+    outstanding = outstanding_native_objects(before)
+    assert outstanding["heif_context"] == 1
+    assert outstanding["heif_image_handle"] >= 1
+
+    # The decoded image keeps the native image only
+    del container
+    outstanding = outstanding_native_objects(before)
+    assert "heif_context" not in outstanding
+    assert outstanding.get("heif_image", 0) <= 1
+
+    del image
+    assert outstanding_native_objects(before) == {}
+
+
+def test_undecoded_images_are_freed(track_native_objects):
+    before = outstanding_native_objects()
+    heif_file = pyheif.open("tests/images/nokia/stereo/stereo_1200x800.heic")
+    assert outstanding_native_objects(before)
+    del heif_file
+    assert outstanding_native_objects(before) == {}
+
+
+def test_native_objects_are_not_tracked_by_default():
+    env = dict(os.environ)
+    env.pop("PYHEIF_TRACK_NATIVE_OBJECTS", None)
+    code = "import pyheif; print(pyheif.reader._native_objects)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, universal_newlines=True
+    )
+    assert result.stdout.strip() == "None"
+
+
+def soak(iterations):
+    """
+    Runs the corpus `iterations` times after a warm-up iteration.
+    Returns the RSS growth in bytes.
+    """
+    # Warm up caches, plugins and the allocator before measuring
+    run_corpus(0)
+    assert outstanding_native_objects() == {}
+    baseline = get_rss()
+
+    for iteration in range(1, iterations + 1):
+        run_corpus(iteration)
+        assert outstanding_native_objects() == {}, f"iteration {iteration}"
+    return get_rss() - baseline
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+@pytest.mark.skipif(
+    "PYHEIF_SOAK_ITERATIONS" not in os.environ, reason="set PYHEIF_SOAK_ITERATIONS to run"
+)
+def test_soak():
+    # glibc creates a malloc arena per thread, up to 8 per CPU, and keeps
+    # their memory after it's freed. Decoding threads would make RSS grow
+    # in steps unrelated to leaks, so run in a process with a single arena.
+    result = subprocess.run(
+        [sys.executable, "-m", "tests.test_soak"],
+        env=dict(os.environ, MALLOC_ARENA_MAX="1"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert result.returncode == 0, result.stderr
+    growth = int(result.stdout)
+    assert growth < RSS_LIMIT, f"RSS grew by {growth / 1024 / 1024:.1f} MB"
+
+
+if __name__ == "__main__":
+    # Objects created from now on are counted by outstanding_native_objects()
+    pyheif.reader._track_native_objects()
+    print(soak(ITERATIONS))